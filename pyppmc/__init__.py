@@ -17,13 +17,14 @@
 
 # """
 
-__all__ = ['foundation', 'notification', 'request', 'server', 'session']
+__all__ = ['foundation', 'notification', 'request', 'server', 'session', 'transport']
 
 from server import Server
-from session import Session
+from session import Session, SessionPool, SessionStore
+from transport import Transport
 
 
-def get_languages(url):
+def get_languages(url, transport=None):
     """Returns a list of available languages.
 
     Returns a list of all languages available to the user on the login page.
@@ -32,6 +33,8 @@ def get_languages(url):
     ----------
     url : str
         Application server URL.
+    transport : :obj:`Transport`, optional
+        HTTP transport settings. Default is a `Transport` with default settings.
 
     Returns
     -------
@@ -39,10 +42,10 @@ def get_languages(url):
         List of all languages available on the login page.
 
     """
-    return Server.get_languages(url)
+    return Server.get_languages(url, transport)
 
 
-def logon(url, username, password, language):
+def logon(url, username, password, language, store=None):
     """Logs onto the application server.
 
     Parameters
@@ -55,6 +58,8 @@ def logon(url, username, password, language):
         Password to log in.
     language : str
         Language used by the user. Must be one of the languages returned by get_languages().
+    store : :obj:`SessionStore`, optional
+        Store of authenticated sessions to resume from and save to.
 
     Returns
     -------
@@ -62,4 +67,4 @@ def logon(url, username, password, language):
         New user session on application server.
 
     """
-    return Session(url, username, password, language)
+    return Session(url, username, password, language, store)
@@ -20,12 +20,16 @@
 
 """
 
-__all__ = ['dm', 'foundation']
+__all__ = ['cache', 'dm', 'foundation', 'pool', 'tokens']
 
 import cx_Oracle
 import re
 import dm
 
+from cache import MetadataCache
+from pool import ConnectionPool
+from tokens import TokenResolver
+
 
 def get_connection(username, password, dsn):
     """Returns a connection to the db.
@@ -48,6 +52,37 @@ def get_connection(username, password, dsn):
     return cx_Oracle.connect(username, password, dsn)
 
 
+def get_pool(username, password, dsn, min=1, max=10, increment=1, timeout=0, health_check=True):
+    """Returns a pool of connections to the db.
+
+    Parameters
+    ----------
+    username : str
+        Username to authenticate on db.
+    password : str
+        Password to authenticate on db.
+    dsn : str
+        Database Data Source Name on Oracle™ Easy Connect Format.
+    min : int, optional
+        Number of sessions opened when the pool is created. Default is 1.
+    max : int, optional
+        Maximum number of sessions in the pool. Default is 10.
+    increment : int, optional
+        Number of sessions opened each time the pool needs to grow. Default is 1.
+    timeout : int, optional
+        Seconds after which idle sessions are closed. Default is 0 (never).
+    health_check : bool, optional
+        Flag to indicate if connections must be pinged when checked out. Default is True.
+
+    Returns
+    -------
+    :[obj]:`ConnectionPool`
+        Pool of cx_Oracle connections.
+
+    """
+    return ConnectionPool(username, password, dsn, min, max, increment, timeout, health_check)
+
+
 def jdbc_to_dsn(url):
     """Converts a JDBC URL into an Oracle™ Easy Connect valid DSN.
 
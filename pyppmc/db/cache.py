@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# Copyright 2018 Alexandre Freitas
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing the db metadata cache.
+
+Request type, context, field and validation definitions only change when configuration is deployed, so persisters
+keep the rows they read in a process-wide cache instead of querying them on every request read. The cache stores raw
+rows, never persister objects, so it does not keep user sessions alive.
+
+Attributes
+----------
+REQUEST_TYPE : str
+    Kind of entries holding request type rows, keyed by request type ID.
+CONTEXTS : str
+    Kind of entries holding request type contexts, keyed by request type ID.
+FIELD_GROUPS : str
+    Kind of entries holding request type field groups, keyed by request type ID.
+FIELDS : str
+    Kind of entries holding field rows, keyed by context ID.
+VALIDATION : str
+    Kind of entries holding validation rows, keyed by validation ID.
+SECTION : str
+    Kind of entries holding section names, keyed by section ID.
+ENTITY_TOKENS : str
+    Kind of entries holding entity token definitions, keyed by entity ID.
+metadata_cache : :[obj]:`MetadataCache`
+    Cache shared by all persisters that are not given a cache of their own.
+
+"""
+
+import time
+
+from pyppmc.util.cache import LRUCache
+
+REQUEST_TYPE = 'REQUEST_TYPE'
+CONTEXTS = 'CONTEXTS'
+FIELD_GROUPS = 'FIELD_GROUPS'
+FIELDS = 'FIELDS'
+VALIDATION = 'VALIDATION'
+SECTION = 'SECTION'
+ENTITY_TOKENS = 'ENTITY_TOKENS'
+
+
+class MetadataCache(LRUCache):
+    """Cache of request type, context, field and validation metadata.
+
+    Entries are keyed by (server URL, kind, ID). Besides expiring after `ttl` seconds, an entry loaded with a stamp
+    function is checked again every `check_interval` seconds: the stamp (usually the LAST_UPDATE_DATE of the source
+    rows) is queried and the entry is reloaded if it changed.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        Maximum number of entries. A value of 0 disables the cache. Default is 4096.
+    ttl : float, optional
+        Seconds an entry is kept. Default is 300.
+    check_interval : float, optional
+        Seconds between LAST_UPDATE_DATE checks of an entry. Default is None (entries are not checked).
+
+    Attributes
+    ----------
+    check_interval : float
+        Seconds between LAST_UPDATE_DATE checks of an entry.
+
+    """
+
+    def __init__(self, max_size=4096, ttl=300, check_interval=None):
+        super(MetadataCache, self).__init__(max_size, ttl)
+        self.check_interval = check_interval
+
+    def fetch(self, session, kind, id, loader, stamp=None):
+        """Returns cached metadata, loading it if needed.
+
+        Parameters
+        ----------
+        session : :[obj]:`Session`
+            A valid PPM session. Its URL is part of the key, so different servers do not share entries.
+        kind : str
+            Kind of metadata (e.g. `FIELDS`).
+        id : int
+            ID of the metadata (e.g. a context ID).
+        loader : callable
+            Function with no arguments that loads the metadata from the db.
+        stamp : callable, optional
+            Function with no arguments that returns the current LAST_UPDATE_DATE of the metadata.
+
+        Returns
+        -------
+        :obj:`object`
+            Cached or freshly loaded metadata.
+
+        """
+        key = (getattr(session, 'url', None), kind, id)
+        check = stamp is not None and self.check_interval is not None
+        now = time.time()
+        entry = self.get(key)
+        if entry is not None:
+            value, version, checked = entry
+            if not check or now - checked < self.check_interval:
+                return value
+            current = stamp()
+            if current == version:
+                self.set(key, (value, version, now))
+                return value
+            version = current
+        else:
+            version = stamp() if check else None
+        value = loader()
+        self.set(key, (value, version, now))
+        return value
+
+    def evict(self, kind=None, id=None):
+        """Removes cached metadata.
+
+        Parameters
+        ----------
+        kind : str, optional
+            Kind of metadata to remove. Default is None (all kinds).
+        id : int, optional
+            ID of the metadata to remove. Default is None (all IDs).
+
+        """
+        for key in self.keys():
+            if (kind is None or key[1] == kind) and (id is None or key[2] == id):
+                self.invalidate(key)
+
+
+metadata_cache = MetadataCache()
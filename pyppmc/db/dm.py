@@ -25,7 +25,11 @@
 import cx_Oracle
 
 from pyppmc.request import RequestType, RequestField, Request
+from pyppmc.util import batch
 from foundation import FieldPersister, ValidationPersister
+from cache import CONTEXTS, ENTITY_TOKENS, FIELD_GROUPS, REQUEST_TYPE, SECTION, metadata_cache
+from pool import connection
+from tokens import TokenResolver
 
 """
     1. Depending on the name, if PPM can't find the value it creates the request and returns no errors (e.g. 
@@ -95,6 +99,8 @@ MIGRATE_FIELD_TOKENS = ['REQ.CREATED_BY', 'REQ.CREATION_DATE', 'REQ.WORKFLOW_STE
 
 STATUS_NOT_SUBMITTED = 14
 
+MAX_IN_LIST_SIZE = 1000
+
 
 def get_request_type(session, request_type_id):
     """Returns details about the given request type.
@@ -136,6 +142,26 @@ def get_request(session, request_id):
     return rp.get(request_id)
 
 
+def get_requests(session, request_ids):
+    """Returns details about the given requests.
+
+    Parameters
+    ----------
+    session : :[obj]:`Session`
+        A valid PPM session.
+    request_ids : list of int
+        IDs of the requests.
+
+    Returns
+    -------
+    list of :[obj]:`Request`
+        Objects containing request data, in the order of `request_ids`.
+
+    """
+    rp = RequestPersister(session)
+    return rp.get_many(request_ids)
+
+
 def update_request(session, request):
     """Updates request data.
 
@@ -156,6 +182,26 @@ def update_request(session, request):
     return rp.save(request)
 
 
+def update_requests(session, requests):
+    """Creates or updates several requests.
+
+    Parameters
+    ----------
+    session : :[obj]:`Session`
+        A valid PPM session.
+    requests : list of :[obj]:`Request`
+        Request data to update. Saved objects are updated in place.
+
+    Returns
+    -------
+    dict of int : str
+        Error messages by position in `requests`.
+
+    """
+    rp = RequestPersister(session)
+    return rp.save_many(requests)
+
+
 def delete_request(session, request):
     """Deletes a request.
 
@@ -182,16 +228,21 @@ class RequestTypePersister(object):
     ----------
     session : :[obj]:`Session`, optional
         A valid PPM session.
+    cache : :[obj]:`MetadataCache`, optional
+        Cache of metadata read from database. Default is the process-wide `cache.metadata_cache`.
 
     """
 
-    def __init__(self, session=None):
+    def __init__(self, session=None, cache=None):
         self.session = session
+        self.cache = cache if cache is not None else metadata_cache
 
     # TODO Resulting Request object fields must have proper data types (e.g. a Date must be returned as a Date).
     def get(self, request_type_id):
         """Returns a request type definition.
 
+        Request type metadata is read from the metadata cache when available.
+
         Parameters
         ----------
         request_type_id : int
@@ -203,23 +254,18 @@ class RequestTypePersister(object):
             Object containing the give request type definition.
 
         """
-        cur = self.session.db_con.cursor()
         request_type = RequestType(persister=self, id=request_type_id)
 
-        cur.execute("""\
-            SELECT request_type_name,
-                   description,
-                   reference_code
-            FROM   kcrt_request_types_nls
-            WHERE  request_type_id = :request_type_id""", request_type_id=request_type_id)
+        row = self.cache.fetch(self.session, REQUEST_TYPE, request_type_id, lambda: self._get_row(request_type_id),
+                               lambda: self._get_stamp(request_type_id))
         request_header_type_id = None
-        for row in cur:
+        if row is not None:
             request_type.name = row[0]
             request_type.description = row[1]
             request_type.reference_code = row[2]
 
         contexts = self._get_contexts(request_type_id)
-        fp = FieldPersister(self.session)
+        fp = FieldPersister(self.session, self.cache)
         fields = dict()
 
         # Retrieve header fields
@@ -259,21 +305,95 @@ class RequestTypePersister(object):
             fields[field_name] = self.__get_request_field(field)
 
         # Set field groups
-        field_groups = list()
-        cur.execute("""\
-            SELECT field_group_id
-            FROM   kcrt_hdr_types_field_groups
-            WHERE  request_header_type_id = :request_header_type_id""", request_header_type_id=request_header_type_id)
-        for row in cur:
-            field_groups += [row[0]]
+        field_groups = self.cache.fetch(self.session, FIELD_GROUPS, request_type_id,
+                                        lambda: self._get_field_groups(request_header_type_id),
+                                        lambda: self._get_stamp(request_type_id))
         request_type.field_groups = list(field_groups)
 
         request_type.fields = dict(fields)
         return request_type
 
+    def _get_row(self, request_type_id):
+        """Queries the name, description and reference code of the given request type.
+
+        Parameters
+        ----------
+        request_type_id : int
+            ID of the request type.
+
+        Returns
+        -------
+        tuple of (str, str, str)
+            Request type name, description and reference code.
+
+        """
+        with connection(self.session) as con:
+            cur = con.cursor()
+            cur.execute("""\
+                SELECT request_type_name,
+                       description,
+                       reference_code
+                FROM   kcrt_request_types_nls
+                WHERE  request_type_id = :request_type_id""", request_type_id=request_type_id)
+            result = None
+            for row in cur:
+                result = row
+            return result
+
+    def _get_field_groups(self, request_header_type_id):
+        """Queries the field groups enabled on the given request header type.
+
+        Parameters
+        ----------
+        request_header_type_id : int
+            ID of the request header type.
+
+        Returns
+        -------
+        list of int
+            List of field group IDs.
+
+        """
+        with connection(self.session) as con:
+            cur = con.cursor()
+            field_groups = list()
+            cur.execute("""\
+                SELECT field_group_id
+                FROM   kcrt_hdr_types_field_groups
+                WHERE  request_header_type_id = :request_header_type_id""",
+                        request_header_type_id=request_header_type_id)
+            for row in cur:
+                field_groups += [row[0]]
+            return field_groups
+
+    def _get_stamp(self, request_type_id):
+        """Returns the last update date of the given request type.
+
+        Parameters
+        ----------
+        request_type_id : int
+            ID of the request type.
+
+        Returns
+        -------
+        :[obj]:`datetime`
+            LAST_UPDATE_DATE of the request type.
+
+        """
+        with connection(self.session) as con:
+            cur = con.cursor()
+            cur.execute("""\
+                SELECT last_update_date
+                FROM   kcrt_request_types
+                WHERE  request_type_id = :request_type_id""", request_type_id=request_type_id)
+            row = cur.fetchone()
+            return row[0] if row is not None else None
+
     def _get_contexts(self, request_type_id):
         """Returns a list of contexts related to the given request type.
 
+        Contexts are read from the metadata cache when available.
+
         Parameters
         ----------
         request_type_id : int
@@ -284,51 +404,85 @@ class RequestTypePersister(object):
         dict of str : int
             Dictionary containing the context IDs related to the request type. Keys are HEADER, DETAIL and USER_DATA.
 
+        Raises
+        ------
+        ValueError
+            If the request type does not exist.
+
         """
-        cur = self.session.db_con.cursor()
-        cur.execute("""\
-            SELECT request_header_type_id
-            FROM   kcrt_request_types_nls
-            WHERE  request_type_id = :request_type_id""", request_type_id=request_type_id)
-        request_header_type_id = None
-        for row in cur:
-            request_header_type_id = row[0]
-
-        context_query = """\
-            SELECT parameter_set_context_id
-            FROM   knta_parameter_set_contexts
-            WHERE  entity_id = :entity_id
-                   AND parameter_set_id = :parameter_set_id"""
-        context_where = """
-                   AND context_value = :context_value"""
-
-        contexts = dict()
-
-        # Header context
-        entity_id = REQUEST_HEADER_TYPE_ENTITY_ID
-        parameter_set_id = 217
-        context_value = str(request_header_type_id)
-        cur.prepare(context_query + context_where)
-        cur.execute(None, entity_id=entity_id, parameter_set_id=parameter_set_id, context_value=context_value)
-        for row in cur:
-            contexts['HEADER'] = row[0]
-
-        # Detail context
-        entity_id = REQUEST_TYPE_ENTITY_ID
-        parameter_set_id = 213
-        context_value = str(request_type_id)
-        cur.execute(None, entity_id=entity_id, parameter_set_id=parameter_set_id, context_value=context_value)
-        for row in cur:
-            contexts['DETAIL'] = row[0]
-
-        # Request user data context
-        entity_id = REQUEST_ENTITY_ID
-        parameter_set_id = 208
-        cur.execute(context_query, entity_id=entity_id, parameter_set_id=parameter_set_id)
-        for row in cur:
-            contexts['USER_DATA'] = row[0]
-
-        return contexts
+        if request_type_id is None:
+            raise ValueError('Unknown request type.')
+        contexts = self.cache.fetch(self.session, CONTEXTS, request_type_id,
+                                    lambda: self._query_contexts(request_type_id),
+                                    lambda: self._get_stamp(request_type_id))
+        return dict(contexts)
+
+    def _query_contexts(self, request_type_id):
+        """Queries the contexts related to the given request type.
+
+        Parameters
+        ----------
+        request_type_id : int
+            ID of the request type
+
+        Returns
+        -------
+        dict of str : int
+            Dictionary containing the context IDs related to the request type. Keys are HEADER, DETAIL and USER_DATA.
+
+        Raises
+        ------
+        ValueError
+            If the request type does not exist.
+
+        """
+        with connection(self.session) as con:
+            cur = con.cursor()
+            cur.execute("""\
+                SELECT request_header_type_id
+                FROM   kcrt_request_types_nls
+                WHERE  request_type_id = :request_type_id""", request_type_id=request_type_id)
+            request_header_type_id = None
+            for row in cur:
+                request_header_type_id = row[0]
+
+            context_query = """\
+                SELECT parameter_set_context_id
+                FROM   knta_parameter_set_contexts
+                WHERE  entity_id = :entity_id
+                       AND parameter_set_id = :parameter_set_id"""
+            context_where = """
+                       AND context_value = :context_value"""
+
+            contexts = dict()
+
+            # Header context
+            entity_id = REQUEST_HEADER_TYPE_ENTITY_ID
+            parameter_set_id = 217
+            context_value = str(request_header_type_id)
+            cur.prepare(context_query + context_where)
+            cur.execute(None, entity_id=entity_id, parameter_set_id=parameter_set_id, context_value=context_value)
+            for row in cur:
+                contexts['HEADER'] = row[0]
+
+            # Detail context
+            entity_id = REQUEST_TYPE_ENTITY_ID
+            parameter_set_id = 213
+            context_value = str(request_type_id)
+            cur.execute(None, entity_id=entity_id, parameter_set_id=parameter_set_id, context_value=context_value)
+            for row in cur:
+                contexts['DETAIL'] = row[0]
+
+            # Request user data context
+            entity_id = REQUEST_ENTITY_ID
+            parameter_set_id = 208
+            cur.execute(context_query, entity_id=entity_id, parameter_set_id=parameter_set_id)
+            for row in cur:
+                contexts['USER_DATA'] = row[0]
+
+            if 'HEADER' not in contexts or 'DETAIL' not in contexts:
+                raise ValueError('Unknown request type: %s.' % request_type_id)
+            return contexts
 
     def __get_request_field(self, field):
         """Returns a `RequestField` object from a `Field` object.
@@ -344,7 +498,6 @@ class RequestTypePersister(object):
             Resulting `RequestField` object.
 
         """
-        cur = self.session.db_con.cursor()
         req_field = RequestField(persister=self, name=field.name, prompt=field.prompt, description=field.description,
                                  validation_id=field.validation_id, default_value=field.default_value[1],
                                  required=field.required, multi=field.multi, display=field.display,
@@ -354,25 +507,46 @@ class RequestTypePersister(object):
             req_field.read_only = False
             req_field.migrate_ok = False
         else:
-            cur.execute("""\
-                SELECT section_name
-                FROM   knta_sections
-                WHERE  section_id = :section_id""", section_id=field.section_id)
-            for row in cur:
-                req_field.section = row[0]
+            req_field.section = self.cache.fetch(self.session, SECTION, field.section_id,
+                                                 lambda: self.__get_section_name(field.section_id))
 
             if field.table_name is None:
                 field_name = 'REQ.%s' % field.name
                 req_field.migrate_ok = (field_name in MIGRATE_FIELD_TOKENS)
                 req_field.read_only = (field_name in IMMUTABLE_TOKENS)
 
-        vp = ValidationPersister(self.session)
+        vp = ValidationPersister(self.session, self.cache)
         validation = vp.get(req_field.validation_id)
         req_field.max_length = validation.max_length
         req_field.data_type = self.__get_data_type(validation.component)
 
         return req_field
 
+    def __get_section_name(self, section_id):
+        """Queries the name of the given section.
+
+        Parameters
+        ----------
+        section_id : int
+            ID of the section.
+
+        Returns
+        -------
+        str
+            Name of the section.
+
+        """
+        with connection(self.session) as con:
+            cur = con.cursor()
+            cur.execute("""\
+                SELECT section_name
+                FROM   knta_sections
+                WHERE  section_id = :section_id""", section_id=section_id)
+            section_name = None
+            for row in cur:
+                section_name = row[0]
+            return section_name
+
     def __get_data_type(self, component):
         """Returns the name of the field data type.
 
@@ -413,11 +587,22 @@ class RequestPersister(object):
     ----------
     session : :[obj]:`Session`, optional
         A valid PPM session.
+    cache : :[obj]:`MetadataCache`, optional
+        Cache of metadata read from database. Default is the process-wide `cache.metadata_cache`.
+    token_resolver : :[obj]:`TokenResolver`, optional
+        Resolver of token SQL values. Default is a new resolver owned by the persister.
+
+    Attributes
+    ----------
+    token_resolver : :[obj]:`TokenResolver`
+        Resolver of token SQL values. Its memo may be shared by passing it to other persisters.
 
     """
 
-    def __init__(self, session=None):
+    def __init__(self, session=None, cache=None, token_resolver=None):
         self.session = session
+        self.cache = cache if cache is not None else metadata_cache
+        self.token_resolver = token_resolver if token_resolver is not None else TokenResolver()
 
     def get(self, request_id):
         """Returns details of the given request.
@@ -437,84 +622,162 @@ class RequestPersister(object):
         RuntimeError
             If a request with the given ID does not exist.
 
+        """
+        return self.get_many([request_id])[0]
+
+    def get_many(self, request_ids, chunk_size=MAX_IN_LIST_SIZE):
+        """Returns details of the given requests.
+
+        Rows are loaded with one query per table for every `chunk_size` requests (instead of one query per table per
+        request), grouped by request and assembled in memory.
+
+        Parameters
+        ----------
+        request_ids : list of int
+            IDs of the requests. IDs given as str are converted to int.
+        chunk_size : int, optional
+            Maximum number of IDs bound to each query. Default is `MAX_IN_LIST_SIZE`, the Oracle™ limit of expressions
+            in a list.
+
+        Returns
+        -------
+        list of :[obj]:`Request`
+            Objects containing details of the given requests, in the order of `request_ids`.
+
+        Raises
+        ------
+        RuntimeError
+            If a request with one of the given IDs does not exist.
+
         """
 
         # TODO Verify if logged user has access to the request.
         # TODO Implement logic to parse tokens (some request fields have, like REQ.REQUEST_URL)
-        cur = self.session.db_con.cursor()
-        request = Request(persister=self)
+        request_ids = [int(request_id) for request_id in request_ids]
+        with connection(self.session) as con:
+            cur = con.cursor()
+            cur.arraysize = chunk_size
+
+            # Retrieve data from tables
+            entity_data = dict()
+            header_data = dict()
+            detail_data = dict()
+            for ids in batch.chunks(batch.unique(request_ids), chunk_size):
+                for row in self.__get_rows(cur, 'kcrt_requests', ids):
+                    entity_data[row['REQUEST_ID']] = row
+                for row in self.__get_rows(cur, 'kcrt_req_header_details', ids):
+                    header_data.setdefault(row['REQUEST_ID'], dict())[row['BATCH_NUMBER']] = row
+                for row in self.__get_rows(cur, 'kcrt_request_details', ids):
+                    detail_data.setdefault(row['REQUEST_ID'], dict())[row['BATCH_NUMBER']] = row
+
+            missing = [str(request_id) for request_id in request_ids if request_id not in entity_data]
+            if len(missing) == 1:
+                raise RuntimeError('Request %s does not exist.' % missing[0])
+            elif len(missing) > 1:
+                raise RuntimeError('Requests %s do not exist.' % ', '.join(missing))
+
+            # Retrieve entity tokens information
+            entity_tokens = self._get_entity_tokens()
+
+            rtp = RequestTypePersister(self.session, self.cache)
+            fp = FieldPersister(self.session, self.cache)
+            contexts = dict()
+            fields = dict()
+            for request_id in entity_data:
+                request_type_id = entity_data[request_id]['REQUEST_TYPE_ID']
+                if request_type_id not in contexts:
+                    contexts[request_type_id] = rtp._get_contexts(request_type_id)
+                    for context_id in contexts[request_type_id].values():
+                        fields[context_id] = fp.get_fields(context_id) or []
+
+            # Resolve header tokens of all requests at once, one token at a time
+            token_ids = dict()
+            for request_id in entity_data:
+                header_context_id = contexts[entity_data[request_id]['REQUEST_TYPE_ID']]['HEADER']
+                for field in fields[header_context_id]:
+                    if field.table_name is None and entity_tokens[field.name][1] is not None:
+                        token_ids.setdefault(field.name, []).append(request_id)
+            token_values = dict((request_id, dict()) for request_id in entity_data)
+            for token in token_ids:
+                values = self.token_resolver.resolve(cur, token, entity_tokens[token][1],
+                                                     [entity_data[request_id] for request_id in token_ids[token]])
+                for request_id, value in zip(token_ids[token], values):
+                    token_values[request_id][token] = value
+
+            requests = dict()
+            for request_id in entity_data:
+                request_type_id = entity_data[request_id]['REQUEST_TYPE_ID']
+                requests[request_id] = self.__build_request(entity_data[request_id],
+                                                            header_data.get(request_id, dict()),
+                                                            detail_data.get(request_id, dict()),
+                                                            token_values[request_id], entity_tokens,
+                                                            contexts[request_type_id], fields)
+
+            return [requests[request_id] for request_id in request_ids]
+
+    def __get_rows(self, cur, table_name, request_ids):
+        """Queries the rows of the given requests on a request table.
 
-        # Retrieve data from tables
-        entity_data = dict()
-        cur.execute("""\
-            SELECT *
-            FROM   kcrt_requests
-            WHERE  request_id = :request_id""", request_id=request_id)
-        for row in cur:
-            for i, col in enumerate(row):
-                entity_data[cur.description[i][0]] = col
+        Parameters
+        ----------
+        cur : :[obj]:`Cursor`
+            cx_Oracle Cursor object.
+        table_name : str
+            Name of the table. Must have a REQUEST_ID column.
+        request_ids : list of int
+            IDs of the requests.
 
-        if cur.rowcount == 0:
-            raise RuntimeError('Request %d does not exist.' % request_id)
+        Returns
+        -------
+        list of dict of str : :obj:`object`
+            Rows by column name.
 
-        header_data = dict()
-        batch_data = dict()
-        cur.execute("""\
-            SELECT *
-            FROM   kcrt_req_header_details
-            WHERE  request_id = :request_id""", request_id=request_id)
-        for row in cur:
-            for i, col in enumerate(row):
-                batch_data[cur.description[i][0]] = col
-            header_data[cur.rowcount] = dict(batch_data)
-
-        detail_data = dict()
-        batch_data = dict()
+        """
+        binds = ', '.join([':%d' % (i + 1) for i in range(len(request_ids))])
         cur.execute("""\
             SELECT *
-            FROM   kcrt_request_details
-            WHERE  request_id = :request_id""", request_id=request_id)
-        for row in cur:
-            for i, col in enumerate(row):
-                batch_data[cur.description[i][0]] = col
-            detail_data[cur.rowcount] = dict(batch_data)
-
-        # Retrieve entity tokens information
-        cur.execute("""\
-            SELECT token,
-                   column_name,
-                   token_sql
-            FROM   knta_entity_tokens_nls
-            WHERE  entity_id = :entity_id""", entity_id=REQUEST_ENTITY_ID)
-        entity_tokens = dict()
-        for row in cur:
-            entity_tokens[row[0]] = (row[1], row[2])
-
-        request_type_id = entity_data['REQUEST_TYPE_ID']
-        rtp = RequestTypePersister(self.session)
-        request_type = rtp.get(request_type_id)
-        contexts = rtp._get_contexts(request_type_id)
+            FROM   %s
+            WHERE  request_id IN (%s)""" % (table_name, binds), request_ids)
+        columns = [col[0] for col in cur.description]
+        return [dict(zip(columns, row)) for row in cur]
+
+    def __build_request(self, entity_data, header_data, detail_data, token_values, entity_tokens, contexts, fields):
+        """Assembles a request object from its rows.
+
+        Parameters
+        ----------
+        entity_data : dict of str : :obj:`object`
+            Request row from kcrt_requests.
+        header_data : dict of int : dict of str : :obj:`object`
+            Request rows from kcrt_req_header_details by batch number.
+        detail_data : dict of int : dict of str : :obj:`object`
+            Request rows from kcrt_request_details by batch number.
+        token_values : dict of str : :obj:`object`
+            Values of the header tokens resolved by token SQL, by token name.
+        entity_tokens : dict of str : tuple of (str, str)
+            Column name and token SQL by token name.
+        contexts : dict of str : int
+            Context IDs of the request type.
+        fields : dict of int : list of :[obj]:`Field`
+            Field definitions by context ID.
+
+        Returns
+        -------
+        :[obj]:`Request`
+            Object containing details of the request.
 
-        fp = FieldPersister(self.session)
+        """
+        request = Request(persister=self)
 
         # Retrieve header fields
         token_prefix = 'REQ'
-        context_id = contexts['HEADER']
-        for field in (fp.get_fields(context_id) or []):
+        for field in fields[contexts['HEADER']]:
             if field.table_name is None:
                 field_name = '%s.%s' % (token_prefix, field.name)
                 if entity_tokens[field.name][1] is None:
                     request.fields[field_name] = entity_data[entity_tokens[field.name][0]]
                 else:
-                    cur.prepare(entity_tokens[field.name][1])
-                    params = dict()
-                    for var in cur.bindnames():
-                        params[var] = entity_data[var]
-                    cur.execute(None, params)
-                    value = None
-                    for row in cur:
-                        value = row[0]
-                    request.fields[field_name] = value
+                    request.fields[field_name] = token_values[field.name]
             else:
                 field_name = '%s.P.%s' % (token_prefix, field.name)
                 request.fields[field_name] = header_data[field.batch_number]['PARAMETER%d' % field.column_number]
@@ -525,8 +788,7 @@ class RequestPersister(object):
 
         # Retrieve detail fields
         token_prefix = 'REQD'
-        context_id = contexts['DETAIL']
-        for field in (fp.get_fields(context_id) or []):
+        for field in fields[contexts['DETAIL']]:
             field_name = '%s.P.%s' % (token_prefix, field.name)
             request.fields[field_name] = detail_data[field.batch_number]['PARAMETER%d' % field.column_number]
 
@@ -535,8 +797,7 @@ class RequestPersister(object):
 
         # Retrieve user data fields
         token_prefix = 'REQ'
-        context_id = contexts['USER_DATA']
-        for field in (fp.get_fields(context_id) or []):
+        for field in fields[contexts['USER_DATA']]:
             field_name = '%s.UD.%s' % (token_prefix, field.name)
             request.fields[field_name] = entity_data['USER_DATA%d' % field.column_number]
 
@@ -558,7 +819,7 @@ class RequestPersister(object):
 
         return request
 
-    def save(self, request):
+    def save(self, request, refresh=True):
         """Creates or updates the request.
 
         If REQ.REQUEST_ID name is present, the request is updated, otherwise it is created.
@@ -567,6 +828,10 @@ class RequestPersister(object):
         ----------
         request : :[obj]:`Request`
             Object containing request data to persist.
+        refresh : bool, optional
+            Flag to indicate if the request must be read back from database after saving. If False, only REQ.REQUEST_ID
+            and REQ.LAST_UPDATE_DATE are set from the procedure output and the request is read back only when its
+            fields are accessed. Default is True.
 
         Returns
         -------
@@ -579,7 +844,160 @@ class RequestPersister(object):
             If create/update operation fails on database.
 
         """
-        cur = self.session.db_con.cursor()
+        with connection(self.session) as con:
+            cur = con.cursor()
+
+            header_ids, detail_ids = self.__get_detail_ids(cur, [request.id] if request.id is not None else [])
+            try:
+                request_id, last_update_date = self.__process(cur, request, dict(), header_ids, detail_ids)
+            except RuntimeError:
+                con.rollback()
+                raise
+
+            con.commit()
+
+            self.__set_saved(request, request_id, last_update_date, refresh)
+            if refresh:
+                self._refresh(request)
+
+            return request
+
+    def save_many(self, requests, commit_size=100, chunk_size=MAX_IN_LIST_SIZE, refresh=True):
+        """Creates or updates the given requests.
+
+        Requests with REQ.REQUEST_ID name are updated, the others are created. Header and detail row IDs of the
+        updated requests are loaded with one query per table for every `chunk_size` requests, request type metadata is
+        resolved once per request type and changes are committed every `commit_size` requests. A request that fails is
+        rolled back to a savepoint and reported, without aborting the others. Saved requests are refreshed with one
+        `get_many` call per commit.
+
+        Parameters
+        ----------
+        requests : list of :[obj]:`Request`
+            Objects containing request data to persist. Saved objects are updated in place.
+        commit_size : int, optional
+            Number of requests processed between commits. Default is 100.
+        chunk_size : int, optional
+            Maximum number of IDs bound to each query. Default is `MAX_IN_LIST_SIZE`.
+        refresh : bool, optional
+            Flag to indicate if saved requests must be read back from database. If False, requests are read back only
+            when their fields are accessed. Default is True.
+
+        Returns
+        -------
+        dict of int : str
+            Error messages by position in `requests`. Empty if all requests were saved.
+
+        """
+        requests = list(requests)
+        errors = dict()
+        with connection(self.session) as con:
+            cur = con.cursor()
+            cur.arraysize = chunk_size
+
+            request_type_ids = dict()
+            for positions in batch.chunks(range(len(requests)), commit_size):
+                updated_ids = [requests[i].id for i in positions if requests[i].id is not None]
+                header_ids, detail_ids = self.__get_detail_ids(cur, updated_ids, chunk_size)
+
+                saved = dict()
+                for i in positions:
+                    cur.execute('SAVEPOINT pyppmc_save_many')
+                    try:
+                        saved[i] = self.__process(cur, requests[i], request_type_ids, header_ids, detail_ids)
+                    except (RuntimeError, ValueError, cx_Oracle.DatabaseError) as e:
+                        cur.execute('ROLLBACK TO SAVEPOINT pyppmc_save_many')
+                        errors[i] = str(e).strip()
+                con.commit()
+
+                for i in saved:
+                    self.__set_saved(requests[i], saved[i][0], saved[i][1], refresh)
+                if refresh:
+                    refreshed = self.get_many([saved[i][0] for i in saved], chunk_size)
+                    for i, req in zip(saved.keys(), refreshed):
+                        requests[i].__dict__ = req.__dict__.copy()
+
+        return errors
+
+    def _refresh(self, request):
+        """Reloads request data from database.
+
+        Parameters
+        ----------
+        request : :[obj]:`Request`
+            Object containing request data. Must have REQ.REQUEST_ID set.
+
+        """
+        req = self.get(request.id)
+        request.__dict__ = req.__dict__.copy()
+
+    def __set_saved(self, request, request_id, last_update_date, refresh):
+        """Sets procedure output on a saved request.
+
+        If the request is not refreshed now, it is refreshed the first time its fields are accessed.
+
+        """
+        request.id = request_id
+        request._fields['REQ.LAST_UPDATE_DATE'] = last_update_date
+        if not refresh:
+            request._loader = self._refresh
+
+    def __get_detail_ids(self, cur, request_ids, chunk_size=MAX_IN_LIST_SIZE):
+        """Returns the IDs of header and detail rows of the given requests.
+
+        Parameters
+        ----------
+        cur : :[obj]:`Cursor`
+            cx_Oracle Cursor object.
+        request_ids : list of int
+            IDs of the requests.
+        chunk_size : int, optional
+            Maximum number of IDs bound to each query. Default is `MAX_IN_LIST_SIZE`.
+
+        Returns
+        -------
+        tuple of (dict of tuple of (int, int) : int, dict of tuple of (int, int) : int)
+            REQ_HEADER_DETAIL_ID and REQUEST_DETAIL_ID values by (request ID, batch number).
+
+        """
+        header_ids = dict()
+        detail_ids = dict()
+        for ids in batch.chunks(batch.unique(request_ids), chunk_size):
+            for row in self.__get_rows(cur, 'kcrt_req_header_details', ids):
+                header_ids[(row['REQUEST_ID'], row['BATCH_NUMBER'])] = row['REQ_HEADER_DETAIL_ID']
+            for row in self.__get_rows(cur, 'kcrt_request_details', ids):
+                detail_ids[(row['REQUEST_ID'], row['BATCH_NUMBER'])] = row['REQUEST_DETAIL_ID']
+        return header_ids, detail_ids
+
+    def __process(self, cur, request, request_type_ids, header_ids, detail_ids):
+        """Creates or updates a request without committing.
+
+        Parameters
+        ----------
+        cur : :[obj]:`Cursor`
+            cx_Oracle Cursor object.
+        request : :[obj]:`Request`
+            Object containing request data to persist.
+        request_type_ids : dict of str : int
+            Request type IDs already resolved by request type name. Updated with the names resolved by this call.
+        header_ids : dict of tuple of (int, int) : int
+            REQ_HEADER_DETAIL_ID values by (request ID, batch number), as returned by `__get_detail_ids`.
+        detail_ids : dict of tuple of (int, int) : int
+            REQUEST_DETAIL_ID values by (request ID, batch number), as returned by `__get_detail_ids`.
+
+        Returns
+        -------
+        tuple of (int, datetime)
+            ID and REQ.LAST_UPDATE_DATE of the created or updated request.
+
+        Raises
+        ------
+        ValueError
+            If request data does not contain request type information.
+        RuntimeError
+            If create/update operation fails on database.
+
+        """
 
         # Delete additional ENTITY_LAST_UPDATE_DATE and STATUS_CODE tokens
         if 'REQ.ENTITY_LAST_UPDATE_DATE' in request.fields:
@@ -592,28 +1010,24 @@ class RequestPersister(object):
         if 'REQ.REQUEST_TYPE_ID' in request.fields:
             request_type_id = request.fields['REQ.REQUEST_TYPE_ID']
         elif request.request_type is not None:
-            cur.execute("""\
-                SELECT request_type_id
-                FROM   kcrt_request_types 
-                WHERE  request_type_name = :request_type_name""", request_type_name=request.request_type)
-            for row in cur:
-                request_type_id = row[0]
-                break
+            if request.request_type not in request_type_ids:
+                cur.execute("""\
+                    SELECT request_type_id
+                    FROM   kcrt_request_types 
+                    WHERE  request_type_name = :request_type_name""", request_type_name=request.request_type)
+                for row in cur:
+                    request_type_ids[request.request_type] = row[0]
+                    break
+            request_type_id = request_type_ids.get(request.request_type)
+            if request_type_id is None:
+                raise ValueError('Unknown request type: %s.' % request.request_type)
         else:
             raise ValueError('Request data does not contain request type information.')
-        rtp = RequestTypePersister(self.session)
+        rtp = RequestTypePersister(self.session, self.cache)
         contexts = rtp._get_contexts(request_type_id)
 
         # Retrieve entity token information
-        cur.execute("""\
-            SELECT token,
-                   column_name,
-                   token_sql
-            FROM   knta_entity_tokens_nls
-            WHERE  entity_id = :entity_id""", entity_id=REQUEST_ENTITY_ID)
-        entity_tokens = dict()
-        for row in cur:
-            entity_tokens[row[0]] = (row[1], row[2])
+        entity_tokens = self._get_entity_tokens()
 
         # Set procedure output parameters
         last_update_date = cur.var(cx_Oracle.DATETIME)
@@ -666,7 +1080,7 @@ class RequestPersister(object):
         params['o_message_name'] = message_name
         params['o_message'] = message
 
-        fp = FieldPersister(self.session)
+        fp = FieldPersister(self.session, self.cache)
         token_prefix = 'REQ'
         header_fields = fp.get_fields(contexts['HEADER'])
         for field in header_fields:
@@ -691,8 +1105,8 @@ class RequestPersister(object):
         params['p_request_id'] = request_id
         cur.callproc('KCRT_REQUESTS_TH.PROCESS_ROW', keywordParameters=params)
         if message_type.getvalue() != 0:
-            self.session.db_con.rollback()
             raise RuntimeError(message.getvalue())
+        request_last_update_date = last_update_date.getvalue()
 
         # Initialize KCRT_REQ_HEADER_DETAILS_TH.PROCESS_ROW parameters
         params = dict()
@@ -732,18 +1146,12 @@ class RequestPersister(object):
         for i in batches:
             req_header_detail_id = cur.var(cx_Oracle.NUMBER)
             if event == 'UPDATE':
-                cur.execute("""\
-                    SELECT req_header_detail_id
-                    FROM   kcrt_req_header_details
-                    WHERE  request_id = :request_id
-                           AND batch_number = :batch_number""", request_id=request_id.getvalue(),
-                            batch_number=i)
-                row = cur.fetchone()
-                req_header_detail_id.setvalue(0, row[0])
+                if (request.id, i) not in header_ids:
+                    raise RuntimeError('Request %s has no kcrt_req_header_details row for batch %d.' % (request.id, i))
+                req_header_detail_id.setvalue(0, header_ids[(request.id, i)])
             batches[i]['p_req_header_detail_id'] = req_header_detail_id
             cur.callproc('KCRT_REQ_HEADER_DETAILS_TH.PROCESS_ROW', keywordParameters=batches[i])
             if message_type.getvalue() != 0:
-                self.session.db_con.rollback()
                 raise RuntimeError(message.getvalue())
 
         # Initialize KCRT_REQUEST_DETAILS_TH.PROCESS_ROW parameters
@@ -778,23 +1186,18 @@ class RequestPersister(object):
 
             field_name = '%s.VP.%s' % (token_prefix, field.name)
             if field_name in request.fields:
-                batches[field.batch_number]['p_visible_parameter%d' % field.column_number] = request.fields[field_name]
+                batches[field.batch_number]['p_visible_parameter%d' % field.column_number] = request.fields[
+                    field_name]
 
         for i in batches:
             request_detail_id = cur.var(cx_Oracle.NUMBER)
             if event == 'UPDATE':
-                cur.execute("""\
-                    SELECT request_detail_id
-                    FROM   kcrt_request_details
-                    WHERE  request_id = :request_id
-                           AND batch_number = :batch_number""", request_id=request_id.getvalue(),
-                            batch_number=i)
-                row = cur.fetchone()
-                request_detail_id.setvalue(0, row[0])
+                if (request.id, i) not in detail_ids:
+                    raise RuntimeError('Request %s has no kcrt_request_details row for batch %d.' % (request.id, i))
+                request_detail_id.setvalue(0, detail_ids[(request.id, i)])
             batches[i]['p_request_detail_id'] = request_detail_id
             cur.callproc('KCRT_REQUEST_DETAILS_TH.PROCESS_ROW', keywordParameters=batches[i])
             if message_type.getvalue() != 0:
-                self.session.db_con.rollback()
                 raise RuntimeError(message.getvalue())
 
         if event == 'INSERT':
@@ -813,12 +1216,7 @@ class RequestPersister(object):
 
             cur.callproc("KCRT_REQUEST_UTIL.MOVE_REQUEST_WORKFLOW", keywordParameters=params)
 
-        self.session.db_con.commit()
-
-        req = self.get(request_id.getvalue())
-        request.__dict__ = req.__dict__.copy()
-
-        return request
+        return request_id.getvalue(), request_last_update_date
 
     def delete(self, request):
         """Deletes the given request.
@@ -839,33 +1237,69 @@ class RequestPersister(object):
             If delete operation fails on database.
 
         """
-        cur = self.session.db_con.cursor()
+        with connection(self.session) as con:
+            cur = con.cursor()
 
-        request_id = cur.var(cx_Oracle.NUMBER)
-        last_update_date = cur.var(cx_Oracle.DATETIME)
-        entity_last_update_date = cur.var(cx_Oracle.DATETIME)
-        message_type = cur.var(cx_Oracle.NUMBER)
-        message_name = cur.var(cx_Oracle.STRING)
-        message = cur.var(cx_Oracle.STRING)
+            request_id = cur.var(cx_Oracle.NUMBER)
+            last_update_date = cur.var(cx_Oracle.DATETIME)
+            entity_last_update_date = cur.var(cx_Oracle.DATETIME)
+            message_type = cur.var(cx_Oracle.NUMBER)
+            message_name = cur.var(cx_Oracle.STRING)
+            message = cur.var(cx_Oracle.STRING)
 
-        request_id.setvalue(0, request.id)
-        params = dict()
-        params['p_event'] = 'DELETE'
-        params['p_request_id'] = request_id
-        # TODO Change to logged user_id.
-        params['p_last_updated_by'] = 1
-        params['o_last_update_date'] = last_update_date
-        params['o_entity_last_update_date'] = entity_last_update_date
-        params['o_message_type'] = message_type
-        params['o_message_name'] = message_name
-        params['o_message'] = message
+            request_id.setvalue(0, request.id)
+            params = dict()
+            params['p_event'] = 'DELETE'
+            params['p_request_id'] = request_id
+            # TODO Change to logged user_id.
+            params['p_last_updated_by'] = 1
+            params['o_last_update_date'] = last_update_date
+            params['o_entity_last_update_date'] = entity_last_update_date
+            params['o_message_type'] = message_type
+            params['o_message_name'] = message_name
+            params['o_message'] = message
+
+            cur.callproc('KCRT_REQUESTS_TH.PROCESS_ROW', keywordParameters=params)
+            if message_type.getvalue() != 0:
+                con.rollback()
+                raise RuntimeError(message.getvalue())
+            request.id = None
 
-        cur.callproc('KCRT_REQUESTS_TH.PROCESS_ROW', keywordParameters=params)
-        if message_type.getvalue() != 0:
-            self.session.db_con.rollback()
-            raise RuntimeError(message.getvalue())
-        request.id = None
+            con.commit()
 
-        self.session.db_con.commit()
+            return request
 
-        return request
+    def _get_entity_tokens(self):
+        """Returns the definition of request entity tokens.
+
+        Token definitions are read from the metadata cache when available.
+
+        Returns
+        -------
+        dict of str : tuple of (str, str)
+            Column name and token SQL by token name.
+
+        """
+        return self.cache.fetch(self.session, ENTITY_TOKENS, REQUEST_ENTITY_ID, self.__get_entity_tokens)
+
+    def __get_entity_tokens(self):
+        """Queries the definition of request entity tokens.
+
+        Returns
+        -------
+        dict of str : tuple of (str, str)
+            Column name and token SQL by token name.
+
+        """
+        with connection(self.session) as con:
+            cur = con.cursor()
+            cur.execute("""\
+                SELECT token,
+                       column_name,
+                       token_sql
+                FROM   knta_entity_tokens_nls
+                WHERE  entity_id = :entity_id""", entity_id=REQUEST_ENTITY_ID)
+            entity_tokens = dict()
+            for row in cur:
+                entity_tokens[row[0]] = (row[1], row[2])
+            return entity_tokens
@@ -18,6 +18,8 @@
 """
 
 from pyppmc.foundation import *
+from cache import FIELDS, VALIDATION, metadata_cache
+from pool import connection
 
 
 class FieldPersister(object):
@@ -27,15 +29,20 @@ class FieldPersister(object):
     ----------
     session : :[obj]:`Session`, optional
         A valid PPM session.
+    cache : :[obj]:`MetadataCache`, optional
+        Cache of metadata read from database. Default is the process-wide `cache.metadata_cache`.
 
     """
 
-    def __init__(self, session=None):
+    def __init__(self, session=None, cache=None):
         self.session = session
+        self.cache = cache if cache is not None else metadata_cache
 
     def get_fields(self, context_id):
         """Retrieves a list of fields defined in the given context_id.
 
+        Field definitions are read from the metadata cache when available.
+
         Parameters
         ----------
         context_id : int
@@ -47,33 +54,10 @@ class FieldPersister(object):
             List of fields on the given context_id.
 
         """
-        cur = self.session.db_con.cursor()
-        cur.execute("""\
-            SELECT parameter_set_field_id,
-                   prompt,
-                   description,
-                   parameter_token,
-                   parameter_column_number,
-                   parameter_table_name,
-                   validation_id,
-                   default_type,
-                   default_const_value,
-                   visible_default_const_value,
-                   section_id,
-                   display_flag,
-                   display_only_flag,
-                   updateable_flag,
-                   required_flag,
-                   enabled_flag,
-                   multi_flag,
-                   batch_number,
-                   visible_to_all_flag, 
-                   editable_by_all_flag,
-                   reference_code
-            FROM   knta_parameter_set_fields
-            WHERE  parameter_set_context_id = :parameter_set_context_id""", parameter_set_context_id=context_id)
+        rows = self.cache.fetch(self.session, FIELDS, context_id, lambda: self._get_field_rows(context_id),
+                                lambda: self._get_fields_stamp(context_id))
         fields = list()
-        for row in cur:
+        for row in rows:
             field = Field(persister=self, id=row[0], name=row[3], context_id=context_id, prompt=row[1],
                           description=row[2], column_number=row[4], table_name=row[5], validation_id=row[6],
                           default_type=row[7], default_value=(row[8], row[9]), section_id=row[10],
@@ -84,6 +68,71 @@ class FieldPersister(object):
             fields += [field]
         return fields
 
+    def _get_field_rows(self, context_id):
+        """Queries the definition rows of the fields in the given context_id.
+
+        Parameters
+        ----------
+        context_id : int
+            ID of the context containing the fields.
+
+        Returns
+        -------
+        list of tuple
+            Field definition rows.
+
+        """
+        with connection(self.session) as con:
+            cur = con.cursor()
+            cur.execute("""\
+                SELECT parameter_set_field_id,
+                       prompt,
+                       description,
+                       parameter_token,
+                       parameter_column_number,
+                       parameter_table_name,
+                       validation_id,
+                       default_type,
+                       default_const_value,
+                       visible_default_const_value,
+                       section_id,
+                       display_flag,
+                       display_only_flag,
+                       updateable_flag,
+                       required_flag,
+                       enabled_flag,
+                       multi_flag,
+                       batch_number,
+                       visible_to_all_flag, 
+                       editable_by_all_flag,
+                       reference_code
+                FROM   knta_parameter_set_fields
+                WHERE  parameter_set_context_id = :parameter_set_context_id""", parameter_set_context_id=context_id)
+            return cur.fetchall()
+
+    def _get_fields_stamp(self, context_id):
+        """Returns the last update date and number of the fields in the given context_id.
+
+        Parameters
+        ----------
+        context_id : int
+            ID of the context containing the fields.
+
+        Returns
+        -------
+        tuple of (:[obj]:`datetime`, int)
+            Most recent LAST_UPDATE_DATE and number of fields.
+
+        """
+        with connection(self.session) as con:
+            cur = con.cursor()
+            cur.execute("""\
+                SELECT MAX(last_update_date),
+                       COUNT(*)
+                FROM   knta_parameter_set_fields
+                WHERE  parameter_set_context_id = :parameter_set_context_id""", parameter_set_context_id=context_id)
+            return cur.fetchone()
+
     def get(self, id):
         """Retrieves details for the given field.
 
@@ -98,41 +147,42 @@ class FieldPersister(object):
             Field object.
 
         """
-        cur = self.session.db_con.cursor()
-        cur.execute("""\
-            SELECT parameter_set_field_id,
-                   prompt,
-                   description,
-                   parameter_token,
-                   parameter_set_context_id,
-                   parameter_column_number,
-                   parameter_table_name,
-                   validation_id,
-                   default_type,
-                   default_const_value,
-                   visible_default_const_value,
-                   section_id,
-                   display_flag,
-                   display_only_flag,
-                   updateable_flag,
-                   required_flag,
-                   enabled_flag,
-                   multi_flag,
-                   batch_number,
-                   visible_to_all_flag, 
-                   editable_by_all_flag,
-                   reference_code
-            FROM   knta_parameter_set_fields
-            WHERE  parameter_set_field_id = :parameter_set_field_id""", parameter_set_field_id=id)
-        for row in cur:
-            field = Field(persister=self, id=row[0], name=row[3], context_id=row[4], prompt=row[1],
-                          description=row[2], column_number=row[5], table_name=row[6], validation_id=row[7],
-                          default_type=row[8], default_value=(row[9], row[10]), section_id=row[11],
-                          display=(row[12] == 'Y'), display_only=(row[13] == 'Y'), updatable=(row[14] == 'Y'),
-                          required=(row[15] == 'Y'), enabled=(row[16] == 'Y'), multi=(row[17] == 'Y'),
-                          batch_number=row[18], visible_to_all=(row[19] == 'Y'), editable_by_all=(row[20] == 'Y'),
-                          reference_code=row[21])
-            return field
+        with connection(self.session) as con:
+            cur = con.cursor()
+            cur.execute("""\
+                SELECT parameter_set_field_id,
+                       prompt,
+                       description,
+                       parameter_token,
+                       parameter_set_context_id,
+                       parameter_column_number,
+                       parameter_table_name,
+                       validation_id,
+                       default_type,
+                       default_const_value,
+                       visible_default_const_value,
+                       section_id,
+                       display_flag,
+                       display_only_flag,
+                       updateable_flag,
+                       required_flag,
+                       enabled_flag,
+                       multi_flag,
+                       batch_number,
+                       visible_to_all_flag, 
+                       editable_by_all_flag,
+                       reference_code
+                FROM   knta_parameter_set_fields
+                WHERE  parameter_set_field_id = :parameter_set_field_id""", parameter_set_field_id=id)
+            for row in cur:
+                field = Field(persister=self, id=row[0], name=row[3], context_id=row[4], prompt=row[1],
+                              description=row[2], column_number=row[5], table_name=row[6], validation_id=row[7],
+                              default_type=row[8], default_value=(row[9], row[10]), section_id=row[11],
+                              display=(row[12] == 'Y'), display_only=(row[13] == 'Y'), updatable=(row[14] == 'Y'),
+                              required=(row[15] == 'Y'), enabled=(row[16] == 'Y'), multi=(row[17] == 'Y'),
+                              batch_number=row[18], visible_to_all=(row[19] == 'Y'), editable_by_all=(row[20] == 'Y'),
+                              reference_code=row[21])
+                return field
 
 
 class ValidationPersister(object):
@@ -142,22 +192,18 @@ class ValidationPersister(object):
     ----------
     session : :[obj]:`Session`, optional
         A valid PPM session.
+    cache : :[obj]:`MetadataCache`, optional
+        Cache of metadata read from database. Default is the process-wide `cache.metadata_cache`.
 
     """
 
-    def __init__(self, session=None):
+    def __init__(self, session=None, cache=None):
         self.session = session
+        self.cache = cache if cache is not None else metadata_cache
 
     def get(self, validation_id):
-        cur = self.session.db_con.cursor()
-        data = dict()
-        cur.execute("""\
-            SELECT *
-            FROM   knta_validations
-            WHERE  validation_id = :validation_id""", validation_id=validation_id)
-        for row in cur:
-            for i, col in enumerate(row):
-                data[cur.description[i][0]] = col
+        data = self.cache.fetch(self.session, VALIDATION, validation_id, lambda: self._get_data(validation_id),
+                                lambda: self._get_stamp(validation_id))
         validation = Validation(persister=None, id=data['VALIDATION_ID'], name=data['VALIDATION_NAME'],
                                 description=data['DESCRIPTION'], max_length=data['MAX_LENGTH'],
                                 enabled=(data['ENABLED_FLAG'] == 'Y'), reference_code=data['REFERENCE_CODE'])
@@ -208,3 +254,52 @@ class ValidationPersister(object):
             validation.component = Validation.PortfolioComponent()
 
         return validation
+
+    def _get_data(self, validation_id):
+        """Queries the definition row of the given validation.
+
+        Parameters
+        ----------
+        validation_id : int
+            ID of the validation.
+
+        Returns
+        -------
+        dict of str : :obj:`object`
+            Validation row by column name.
+
+        """
+        with connection(self.session) as con:
+            cur = con.cursor()
+            data = dict()
+            cur.execute("""\
+                SELECT *
+                FROM   knta_validations
+                WHERE  validation_id = :validation_id""", validation_id=validation_id)
+            for row in cur:
+                for i, col in enumerate(row):
+                    data[cur.description[i][0]] = col
+            return data
+
+    def _get_stamp(self, validation_id):
+        """Returns the last update date of the given validation.
+
+        Parameters
+        ----------
+        validation_id : int
+            ID of the validation.
+
+        Returns
+        -------
+        :[obj]:`datetime`
+            LAST_UPDATE_DATE of the validation.
+
+        """
+        with connection(self.session) as con:
+            cur = con.cursor()
+            cur.execute("""\
+                SELECT last_update_date
+                FROM   knta_validations
+                WHERE  validation_id = :validation_id""", validation_id=validation_id)
+            row = cur.fetchone()
+            return row[0] if row is not None else None
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# Copyright 2018 Alexandre Freitas
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing db connection pooling methods.
+
+"""
+
+import contextlib
+import cx_Oracle
+import threading
+
+
+class ConnectionPool(object):
+    """Pool of db connections based on cx_Oracle SessionPool.
+
+    Connections are checked out per operation and returned to the pool afterwards. Checkouts are reentrant on the
+    same thread, so nested persister calls share one connection (and one transaction) instead of taking several
+    sessions from the pool.
+
+    Parameters
+    ----------
+    username : str
+        Username to authenticate on db.
+    password : str
+        Password to authenticate on db.
+    dsn : str
+        Database Data Source Name on Oracle™ Easy Connect Format.
+    min : int, optional
+        Number of sessions opened when the pool is created. Default is 1.
+    max : int, optional
+        Maximum number of sessions in the pool. Default is 10.
+    increment : int, optional
+        Number of sessions opened each time the pool needs to grow. Default is 1.
+    timeout : int, optional
+        Seconds after which idle sessions are closed. Default is 0 (never).
+    health_check : bool, optional
+        Flag to indicate if connections must be pinged when checked out. Dead connections are dropped from the pool
+        and replaced. Default is True.
+
+    Attributes
+    ----------
+    pool : :[obj]:`SessionPool`
+        cx_Oracle SessionPool object.
+    health_check : bool
+        Flag to indicate if connections must be pinged when checked out.
+
+    """
+
+    def __init__(self, username, password, dsn, min=1, max=10, increment=1, timeout=0, health_check=True):
+        self.pool = cx_Oracle.SessionPool(username, password, dsn, min, max, increment, threaded=True,
+                                          getmode=cx_Oracle.SPOOL_ATTRVAL_WAIT)
+        self.pool.timeout = timeout
+        self.health_check = health_check
+        self._local = threading.local()
+
+    def acquire(self):
+        """Checks out a connection from the pool.
+
+        Returns
+        -------
+        :[obj]:`Connection`
+            cx_Oracle Connection object.
+
+        """
+        con = self.pool.acquire()
+        if self.health_check:
+            try:
+                con.ping()
+            except cx_Oracle.DatabaseError:
+                self.pool.drop(con)
+                con = self.pool.acquire()
+        return con
+
+    def release(self, con):
+        """Returns a connection to the pool.
+
+        Parameters
+        ----------
+        con : :[obj]:`Connection`
+            cx_Oracle Connection object checked out by `acquire`.
+
+        """
+        self.pool.release(con)
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Checks out a connection for the duration of a `with` block.
+
+        If the current thread already holds a connection from this pool, that connection is reused. Uncommitted
+        changes are rolled back if the block raises an exception.
+
+        Yields
+        ------
+        :[obj]:`Connection`
+            cx_Oracle Connection object.
+
+        """
+        con = getattr(self._local, 'con', None)
+        if con is not None:
+            yield con
+            return
+
+        con = self.acquire()
+        self._local.con = con
+        try:
+            yield con
+        except Exception:
+            con.rollback()
+            raise
+        finally:
+            self._local.con = None
+            self.release(con)
+
+
+@contextlib.contextmanager
+def connection(session):
+    """Provides a db connection for the given session.
+
+    A connection is checked out from `session.db_pool` when the session owns a pool. Otherwise `session.db_con` is
+    used.
+
+    Parameters
+    ----------
+    session : :[obj]:`Session`
+        A valid PPM session.
+
+    Yields
+    ------
+    :[obj]:`Connection`
+        cx_Oracle Connection object.
+
+    """
+    pool = getattr(session, 'db_pool', None)
+    if pool is None:
+        yield session.db_con
+    else:
+        with pool.connection() as con:
+            yield con
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+# Copyright 2018 Alexandre Freitas
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing entity token resolution methods.
+
+Entity tokens such as REQ.WORKFLOW_NAME are resolved by a token SQL (knta_entity_tokens_nls.token_sql) whose bind
+variables are columns of the entity row. Instead of running the token SQL once per entity, `TokenResolver` runs it
+once for a whole batch of distinct bind values and remembers the values already resolved.
+
+"""
+
+import cx_Oracle
+import re
+
+from pyppmc.util import batch
+from pyppmc.util.cache import LRUCache
+
+_MISSING = object()
+
+
+def rename_binds(sql, names, suffix):
+    """Renames bind variables of a SQL statement.
+
+    Quoted literals are left untouched.
+
+    Parameters
+    ----------
+    sql : str
+        SQL statement.
+    names : list of str
+        Names of the bind variables (case insensitive).
+    suffix : str
+        Suffix to append to the position of each name. Bind variable `names[j]` is renamed to `B<j>_<suffix>`.
+
+    Returns
+    -------
+    str
+        SQL statement with renamed bind variables.
+
+    """
+    positions = dict((name.upper(), j) for j, name in enumerate(names))
+
+    def rename(m):
+        j = positions.get(m.group(1).upper())
+        return m.group(0) if j is None else ':B%d_%s' % (j, suffix)
+
+    parts = re.split(r"('(?:[^']|'')*')", sql)
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r'(?<![\w:]):(\w+)', rename, parts[i])
+    return ''.join(parts)
+
+
+class TokenResolver(object):
+    """Resolves token SQL values for many entity rows at once.
+
+    For each batch of distinct bind values, the token SQL is wrapped as a scalar subquery and the copies are joined
+    with UNION ALL, so a single statement resolves the whole batch. Token SQL that cannot be used as a scalar subquery
+    (e.g. it returns several rows) is executed once per distinct bind value instead.
+
+    Parameters
+    ----------
+    batch_size : int, optional
+        Maximum number of distinct bind values resolved by each statement. Default is 100.
+    max_size : int, optional
+        Maximum number of resolved values remembered. Default is 65536.
+    ttl : float, optional
+        Seconds a resolved value is remembered. Default is 300.
+
+    Attributes
+    ----------
+    batch_size : int
+        Maximum number of distinct bind values resolved by each statement.
+    memo : :[obj]:`LRUCache`
+        Resolved values by (token, bind values).
+
+    """
+
+    def __init__(self, batch_size=100, max_size=65536, ttl=300):
+        self.batch_size = batch_size
+        self.memo = LRUCache(max_size, ttl)
+
+    def resolve(self, cur, token, token_sql, rows):
+        """Returns the values of a token for the given entity rows.
+
+        Parameters
+        ----------
+        cur : :[obj]:`Cursor`
+            cx_Oracle Cursor object.
+        token : str
+            Name of the token.
+        token_sql : str
+            SQL that resolves the token. Bind variables are columns of the entity row.
+        rows : list of dict of str : :obj:`object`
+            Entity rows by column name.
+
+        Returns
+        -------
+        list of :obj:`object`
+            Token values, in the order of `rows`.
+
+        """
+        cur.prepare(token_sql)
+        names = cur.bindnames()
+        keys = [tuple([row[name] for name in names]) for row in rows]
+
+        values = dict()
+        pending = []
+        for key in batch.unique(keys):
+            value = self.memo.get((token, key), _MISSING)
+            if value is _MISSING:
+                pending += [key]
+            else:
+                values[key] = value
+
+        for chunk in batch.chunks(pending, self.batch_size):
+            if len(names) == 0 or len(chunk) == 1:
+                resolved = self.__execute(cur, token_sql, names, chunk)
+            else:
+                try:
+                    resolved = self.__execute_batch(cur, token_sql, names, chunk)
+                except cx_Oracle.DatabaseError:
+                    resolved = self.__execute(cur, token_sql, names, chunk)
+            for key, value in zip(chunk, resolved):
+                self.memo.set((token, key), value)
+                values[key] = value
+
+        return [values[key] for key in keys]
+
+    def clear(self):
+        """Forgets all resolved values.
+
+        """
+        self.memo.clear()
+
+    def __execute(self, cur, token_sql, names, keys):
+        """Resolves a token running its SQL once per bind values.
+
+        The value of the token is the first column of the last row returned.
+
+        """
+        cur.prepare(token_sql)
+        result = []
+        for key in keys:
+            cur.execute(None, dict(zip(names, key)))
+            value = None
+            for row in cur:
+                value = row[0]
+            result += [value]
+        return result
+
+    def __execute_batch(self, cur, token_sql, names, keys):
+        """Resolves a token for several bind values with a single statement.
+
+        """
+        parts = []
+        params = dict()
+        for i, key in enumerate(keys):
+            parts += ['SELECT %d AS idx, (%s) AS value FROM dual' % (i, rename_binds(token_sql, names, i))]
+            for j, value in enumerate(key):
+                params['B%d_%d' % (j, i)] = value
+        cur.execute('\nUNION ALL\n'.join(parts), params)
+        values = dict(cur.fetchall())
+        return [values.get(i) for i in range(len(keys))]
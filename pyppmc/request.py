@@ -224,18 +224,38 @@ class Request(object):
     source : str
         Source identifier.
     fields : dict of str : :[obj]:`Object`
-        Request fields.
+        Request fields. If the request was saved without refresh, it is reloaded from its persister the first time
+        fields are accessed.
+    last_update_date : datetime
+        Value of REQ.LAST_UPDATE_DATE field. Does not reload the request.
 
     """
 
+    @property
+    def fields(self):
+        if self._loader is not None:
+            loader, self._loader = self._loader, None
+            loader(self)
+        return self._fields
+
+    @fields.setter
+    def fields(self, value):
+        self._loader = None
+        self._fields = value
+
     @property
     def id(self):
-        if 'REQ.REQUEST_ID' in self.fields:
-            return self.fields['REQ.REQUEST_ID']
+        if 'REQ.REQUEST_ID' in self._fields:
+            return self._fields['REQ.REQUEST_ID']
 
     @id.setter
     def id(self, value):
-        self.fields['REQ.REQUEST_ID'] = value
+        self._fields['REQ.REQUEST_ID'] = value
+
+    @property
+    def last_update_date(self):
+        if 'REQ.LAST_UPDATE_DATE' in self._fields:
+            return self._fields['REQ.LAST_UPDATE_DATE']
 
     @property
     def description(self):
@@ -259,6 +279,7 @@ class Request(object):
                  fields=None):
         self.persister = persister
         self.source_type = source_type
+        self._loader = None
         self.fields = fields or dict()
         self.id = id
         self.description = description
@@ -24,13 +24,15 @@ ISO_DATE_FORMAT : str
 
 """
 
-__all__ = ['dm', 'tm']
+__all__ = ['client', 'dm', 'tm']
 
 import datetime
 import httplib
 import requests
 import urlparse
 
+from pyppmc.transport import get_base_url
+
 ISO_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
 
 
@@ -101,18 +103,7 @@ def call_operation(http_session, method, path, data=None, params=None, message_t
         If HTTP response status code is not equal to 200.
 
     """
-    base_url = ''
-    for cookie in http_session.cookies:
-        if cookie.name == 'JSESSIONID' and cookie.path == '/itg/':
-            if cookie.secure:
-                protocol = 'https'
-                port = 443 if cookie.port is None else cookie.port
-            else:
-                protocol = 'http'
-                port = 80 if cookie.port is None else cookie.port
-            domain = cookie.domain
-            base_url = '%s://%s:%d/' % (protocol, domain, port)
-            break
+    base_url = getattr(http_session, 'base_url', None) or get_base_url(http_session.cookies) or ''
 
     if message_type == 'xml':
         headers = {'Content-Type': 'application/xml; charset=utf-8'}
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+# Copyright 2018 Alexandre Freitas
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""client.py
+
+Module containing a concurrent client for RESTful web services operations.
+
+Operations run on a pool of threads sharing the logged on HTTP session, so many of them can wait on the application
+server at the same time. Each call returns immediately with a result object; `gather` waits for a group of them.
+
+Examples
+--------
+>>> client = AsyncClient(session.http_session, concurrency=16, timeout=60)
+>>> results = client.gather([client.tm.get_time_sheets(user_id, period_id) for user_id in user_ids])
+>>> client.close()
+
+"""
+
+import inspect
+import dm
+import rest
+import tm
+
+from multiprocessing.pool import ThreadPool
+from util import batch
+
+
+class _TimeoutSession(object):
+    """HTTP session wrapper that applies a default timeout to all requests.
+
+    Cookies, authentication and connection pools are those of the wrapped session.
+
+    """
+
+    def __init__(self, http_session, timeout):
+        self.http_session = http_session
+        self.timeout = timeout
+
+    def __getattr__(self, name):
+        return getattr(self.http_session, name)
+
+    def request(self, method, url, **kwargs):
+        if self.timeout is not None:
+            kwargs.setdefault('timeout', self.timeout)
+        return self.http_session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+    def put(self, url, data=None, **kwargs):
+        return self.request('PUT', url, data=data, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+
+class _ModuleProxy(object):
+    """Runs the operations of a module on the client.
+
+    Each function of the module taking an HTTP session as first argument is exposed with the same name and the
+    remaining arguments. Calls return an `AsyncResult` instead of the operation result.
+
+    """
+
+    def __init__(self, client, module):
+        self._client = client
+        self._module = module
+
+    def __getattr__(self, name):
+        func = getattr(self._module, name)
+        if not inspect.isfunction(func) or name.startswith('_'):
+            raise AttributeError('%s has no operation %s.' % (self._module.__name__, name))
+
+        def submit(*args, **kwargs):
+            return self._client.submit(func, *args, **kwargs)
+
+        submit.__name__ = name
+        submit.__doc__ = func.__doc__
+        return submit
+
+
+class AsyncClient(object):
+    """Concurrent client for RESTful web services operations.
+
+    Parameters
+    ----------
+    http_session : :[obj]:`Session`
+        A logged on request.Session session object. Its cookies are shared by all operations. Its connection pool
+        should hold at least `concurrency` connections (see `Transport`).
+    concurrency : int, optional
+        Maximum number of operations running at the same time. Default is 8.
+    timeout : float, optional
+        Seconds to wait for the application server on each HTTP request. Default is None (wait indefinitely).
+
+    Attributes
+    ----------
+    http_session : :[obj]:`Session`
+        HTTP session object used by the operations.
+    concurrency : int
+        Maximum number of operations running at the same time.
+    timeout : float
+        Seconds to wait for the application server on each HTTP request.
+    dm : :obj:`object`
+        Operations of `rest.dm`, e.g. ``client.dm.get_request(request_id)``.
+    tm : :obj:`object`
+        Operations of `rest.tm`, e.g. ``client.tm.get_time_sheets(user_id, period_id)``.
+
+    """
+
+    def __init__(self, http_session, concurrency=8, timeout=None):
+        self.http_session = _TimeoutSession(http_session, timeout)
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.dm = _ModuleProxy(self, dm)
+        self.tm = _ModuleProxy(self, tm)
+        self._pool = ThreadPool(concurrency)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, func, *args, **kwargs):
+        """Runs an operation on the client.
+
+        Parameters
+        ----------
+        func : callable
+            Operation to run. Called with the client HTTP session as first argument, followed by `args` and
+            `kwargs`.
+
+        Returns
+        -------
+        :obj:`multiprocessing.pool.AsyncResult`
+            Result of the operation. Call `get` to wait for it.
+
+        """
+        return self._pool.apply_async(func, (self.http_session,) + args, kwargs)
+
+    def call_operation(self, method, path, data=None, params=None, message_type='xml'):
+        """Calls a REST service operation on the client.
+
+        See `rest.call_operation` for a description of the parameters.
+
+        Returns
+        -------
+        :obj:`multiprocessing.pool.AsyncResult`
+            Result of the operation. Call `get` to wait for the HTTP Response object.
+
+        """
+        return self.submit(rest.call_operation, method, path, data, params, message_type)
+
+    def gather(self, results, timeout=None, return_exceptions=False):
+        """Waits for several operations.
+
+        Parameters
+        ----------
+        results : list of :obj:`multiprocessing.pool.AsyncResult`
+            Results returned by the client.
+        timeout : float, optional
+            Seconds to wait for each operation. Default is None (wait indefinitely).
+        return_exceptions : bool, optional
+            Flag to indicate if exceptions raised by operations must be returned in place of their results instead
+            of raised. Default is False.
+
+        Returns
+        -------
+        list of :obj:`object`
+            Results of the operations, in the order of `results`.
+
+        Raises
+        ------
+        multiprocessing.TimeoutError
+            If an operation does not finish in `timeout` seconds.
+
+        """
+        values = []
+        for result in results:
+            try:
+                outcome = batch.BatchResult(result, result.get(timeout))
+            except Exception as e:
+                outcome = batch.BatchResult(result, error=e)
+            values += [self.__value(outcome, return_exceptions)]
+        return values
+
+    def map(self, func, args, timeout=None, return_exceptions=False):
+        """Runs an operation once for each set of arguments and waits for all of them.
+
+        Parameters
+        ----------
+        func : callable
+            Operation to run. Called with the client HTTP session as first argument.
+        args : list of tuple
+            Arguments of each call, after the HTTP session.
+        timeout : float, optional
+            Seconds to wait for each operation. Default is None (wait indefinitely).
+        return_exceptions : bool, optional
+            Flag to indicate if exceptions must be returned in place of results. Default is False.
+
+        Returns
+        -------
+        list of :obj:`object`
+            Results of the operations, in the order of `args`.
+
+        Raises
+        ------
+        multiprocessing.TimeoutError
+            If an operation does not finish in `timeout` seconds.
+
+        """
+        results = batch.bulk_map(lambda arg: func(self.http_session, *arg), args, timeout=timeout, pool=self._pool)
+        return [self.__value(result, return_exceptions) for result in results]
+
+    def close(self):
+        """Stops the client threads. Operations not yet started are cancelled.
+
+        """
+        self._pool.terminate()
+        self._pool.join()
+
+    @staticmethod
+    def __value(result, return_exceptions):
+        if result.ok or not return_exceptions:
+            return result.get()
+        return result.error
@@ -31,6 +31,7 @@ import json
 import rest
 
 from request import Request
+from util import batch
 
 REQUESTS_PATH = '/itg/rest/dm/requests'
 REQUEST_TYPES_PATH = '/itg/rest/dm/requestTypes'
@@ -124,6 +125,30 @@ def get_request(http_session, request_id):
     return request
 
 
+def get_requests_by_id(http_session, request_ids, workers=8, ordered=True):
+    """Returns the given requests, retrieving several of them at the same time.
+
+    Parameters
+    ----------
+    http_session : :[obj]:`Session`
+        HTTP session object. Its connection pool should hold at least `workers` connections (see `Transport`).
+    request_ids : list of int
+        Request ids.
+    workers : int, optional
+        Maximum number of requests retrieved at the same time. Default is 8.
+    ordered : bool, optional
+        Flag to indicate if results are yielded in the order of `request_ids`. If False, results are yielded as they
+        complete. Default is True.
+
+    Yields
+    ------
+    :[obj]:`BatchResult`
+        Result of each request id (`item`), holding the Request object (`value`) or the exception raised (`error`).
+
+    """
+    return batch.bulk_map(lambda request_id: get_request(http_session, request_id), request_ids, workers, ordered)
+
+
 def update_request(http_session, request):
     """Creates or updates a request.
 
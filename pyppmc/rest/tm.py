@@ -36,6 +36,8 @@ WORK_ITEMS_PATH
 
 import rest
 
+from util import batch
+
 PERIODS_PATH = '/itg/rest/tm/Periods'
 POLICIES_PATH = '/itg/rest/tm/policies'
 TIME_PERIODS_PATH = '/itg/rest/tm/timePeriods'
@@ -71,6 +73,34 @@ def get_time_sheets(http_session, user_id, period_id):
     return rest.call_operation(http_session, 'GET', path, params=params, message_type='json')
 
 
+def get_users_time_sheets(http_session, user_ids, period_id, workers=8, ordered=True):
+    """Returns time sheets for several users in the given period, retrieving several of them at the same time.
+
+    Parameters
+    ----------
+    http_session : :[obj]:`Session`
+        HTTP session object. Its connection pool should hold at least `workers` connections (see `Transport`).
+    user_ids : list of int
+        IDs of the time sheet owners.
+    period_id : int
+        Time period id.
+    workers : int, optional
+        Maximum number of operations running at the same time. Default is 8.
+    ordered : bool, optional
+        Flag to indicate if results are yielded in the order of `user_ids`. If False, results are yielded as they
+        complete. Default is True.
+
+    Yields
+    ------
+    :[obj]:`BatchResult`
+        Result of each user id (`item`), holding the HTTP Response object (`value`) or the exception raised
+        (`error`).
+
+    """
+    return batch.bulk_map(lambda user_id: get_time_sheets(http_session, user_id, period_id), user_ids, workers,
+                          ordered)
+
+
 # TODO Rewrite method to return a time sheet object.
 def get_time_sheet(http_session, time_sheet_id):
     """Returns time sheet details for the given id.
@@ -197,6 +227,32 @@ def get_time_sheet_lines(http_session, time_sheet_id):
     return rest.call_operation(http_session, 'GET', path, message_type='json')
 
 
+def get_time_sheets_lines(http_session, time_sheet_ids, workers=8, ordered=True):
+    """Returns time sheet lines of several time sheets, retrieving several of them at the same time.
+
+    Parameters
+    ----------
+    http_session : :[obj]:`Session`
+        HTTP session object. Its connection pool should hold at least `workers` connections (see `Transport`).
+    time_sheet_ids : list of int
+        Time sheet ids.
+    workers : int, optional
+        Maximum number of operations running at the same time. Default is 8.
+    ordered : bool, optional
+        Flag to indicate if results are yielded in the order of `time_sheet_ids`. If False, results are yielded as
+        they complete. Default is True.
+
+    Yields
+    ------
+    :[obj]:`BatchResult`
+        Result of each time sheet id (`item`), holding the HTTP Response object (`value`) or the exception raised
+        (`error`).
+
+    """
+    return batch.bulk_map(lambda time_sheet_id: get_time_sheet_lines(http_session, time_sheet_id), time_sheet_ids,
+                          workers, ordered)
+
+
 # TODO Rewrite method to return a time sheet line object.
 def get_time_sheet_line(http_session, time_sheet_line_id):
     """Returns details for given time sheet line.
@@ -33,6 +33,7 @@ PUBLIC_KEY_HEADER : str
 import elgamal
 import re
 
+from elgamal import Encryptor
 from elgamal import PrivateKey
 from elgamal import PublicKey
 
@@ -183,3 +184,27 @@ def decrypt(text, private_key):
 
     """
     return elgamal.decrypt2(get_cypher_text(text), private_key)
+
+
+def decrypt_many(texts, private_key, processes=1):
+    """Decrypts several texts using given private key.
+
+    This methods handles if each text is delimited (by `HASH_DELIMITER` or `PASSWORD_DELIMITER`) or not.
+
+    Parameters
+    ----------
+    texts : list of str
+        Texts to be decrypted.
+    private_key
+        Private key to decrypt.
+    processes : int, optional
+        Number of worker processes. If None, the number of CPUs is used. Default is 1 (texts are decrypted in the
+        calling process).
+
+    Returns
+    -------
+    list of str
+        Decrypted texts, in the order of `texts`.
+
+    """
+    return elgamal.decrypt_many([get_cypher_text(text) for text in texts], private_key, processes)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# Copyright 2018 Alexandre Freitas
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing big integer arithmetic backends for the encryption methods.
+
+The gmpy2 backend uses GMP numbers and is selected when gmpy2 is installed. Otherwise, the Python backend uses
+built-in longs. Functions of this module are rebound by `use`, so callers must reference them through the module (e.g.
+``arithmetic.powmod``) to follow backend changes.
+
+Attributes
+----------
+    BACKENDS : list of str
+        Names of the available backends.
+    backend : str
+        Name of the backend in use.
+    mpz : callable
+        Converts a number to the integer type of the backend. Results of `powmod` and `invert` have this type.
+    powmod : callable
+        powmod(base, exp, modulus) calculates `base`^`exp` (modulo `modulus`).
+    invert : callable
+        invert(value, modulus) calculates the modular inverse of `value` (modulo `modulus`). Raises ZeroDivisionError
+        if `value` is not invertible.
+
+"""
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+BACKENDS = ['python'] + (['gmpy2'] if gmpy2 is not None else [])
+
+
+def _python_mpz(value):
+    return long(value)
+
+
+def _python_invert(value, modulus):
+    a, b = value % modulus, modulus
+    x0, x1 = 1, 0
+    while b != 0:
+        q, a, b = a // b, b, a % b
+        x0, x1 = x1, x0 - q * x1
+    if a != 1:
+        raise ZeroDivisionError('%d is not invertible modulo %d.' % (value, modulus))
+    return x0 % modulus
+
+
+def _gmpy2_invert(value, modulus):
+    result = gmpy2.invert(value, modulus)
+    if result == 0 and modulus != 1:
+        raise ZeroDivisionError('%d is not invertible modulo %d.' % (value, modulus))
+    return result
+
+
+def use(name):
+    """Selects the arithmetic backend.
+
+    Parameters
+    ----------
+    name : str
+        Name of the backend: 'python' or 'gmpy2'.
+
+    Raises
+    ------
+    ValueError
+        If the backend is not available.
+
+    """
+    global backend, mpz, powmod, invert
+    if name not in BACKENDS:
+        raise ValueError('Arithmetic backend not available: %s.' % name)
+    if name == 'gmpy2':
+        mpz, powmod, invert = gmpy2.mpz, gmpy2.powmod, _gmpy2_invert
+    else:
+        mpz, powmod, invert = _python_mpz, pow, _python_invert
+    backend = name
+
+
+use(BACKENDS[-1])
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# Copyright 2018 Alexandre Freitas
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark of the arithmetic backends used by the encryption methods.
+
+Random keys of each size are generated, then modular exponentiation, encryption and decryption are timed on every
+available backend (see `arithmetic.BACKENDS`).
+
+Examples
+--------
+$ python -m pyppmc.security.benchmark --bits 1024 2048 --count 200
+
+"""
+
+import argparse
+import random
+import time
+
+from pyppmc.security import arithmetic, elgamal
+
+SMALL_PRIMES = [q for q in range(3, 2000, 2) if all(q % d for d in range(3, int(q ** 0.5) + 1, 2))]
+
+
+def is_probable_prime(n, rounds=20):
+    """Checks if a number is prime with the Miller-Rabin test.
+
+    Parameters
+    ----------
+    n : int
+        Number to test.
+    rounds : int, optional
+        Number of random bases tested. Default is 20.
+
+    Returns
+    -------
+    bool
+        False if `n` is composite; True if it is prime with probability at least 1 - 4^-`rounds`.
+
+    """
+    if n < 2:
+        return False
+    for q in [2] + SMALL_PRIMES:
+        if n % q == 0:
+            return n == q
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for i in range(rounds):
+        x = arithmetic.powmod(random.randrange(2, n - 1), d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for j in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def generate_keys(bit_length):
+    """Generates a random ElGamal key pair.
+
+    Parameters
+    ----------
+    bit_length : int
+        Bit length of the modulus.
+
+    Returns
+    -------
+    tuple of (:obj:`elgamal.PublicKey`, :obj:`elgamal.PrivateKey`)
+        Public and private keys.
+
+    """
+    while True:
+        p = random.getrandbits(bit_length) | (1 << (bit_length - 1)) | 1
+        if is_probable_prime(p):
+            break
+    g = 2
+    x = random.randrange(2, p - 1)
+    y = long(arithmetic.powmod(g, x, p))
+    return elgamal.PublicKey(bit_length, p, g, y), elgamal.PrivateKey(bit_length, p, g, x)
+
+
+def run(bit_lengths, count):
+    """Times arithmetic, encryption and decryption on every backend and prints the results.
+
+    Parameters
+    ----------
+    bit_lengths : list of int
+        Bit lengths of the keys.
+    count : int
+        Number of operations of each kind.
+
+    """
+    texts = ['secret password %d' % i for i in range(count)]
+    print '%-8s %-8s %12s %12s %12s %12s' % ('bits', 'backend', 'powmod/s', 'encrypt/s', 'encryptor/s', 'decrypt/s')
+    for bit_length in bit_lengths:
+        public_key, private_key = generate_keys(bit_length)
+        exponents = [random.getrandbits(bit_length) for i in range(count)]
+        for backend in arithmetic.BACKENDS:
+            arithmetic.use(backend)
+            rates = []
+
+            start = time.time()
+            for e in exponents:
+                arithmetic.powmod(public_key.g, e, public_key.p)
+            rates += [count / (time.time() - start)]
+
+            start = time.time()
+            encrypted = [elgamal.encrypt2(text, public_key) for text in texts]
+            rates += [count / (time.time() - start)]
+
+            start = time.time()
+            elgamal.Encryptor(public_key).encrypt_many(texts)
+            rates += [count / (time.time() - start)]
+
+            start = time.time()
+            decrypted = elgamal.decrypt_many(encrypted, private_key)
+            rates += [count / (time.time() - start)]
+
+            if decrypted != texts:
+                raise RuntimeError('Decryption failed with %s backend.' % backend)
+            print '%-8d %-8s %12.1f %12.1f %12.1f %12.1f' % tuple([bit_length, backend] + rates)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the encryption arithmetic backends.')
+    parser.add_argument('--bits', type=int, nargs='+', default=[1024, 2048], help='bit lengths of the keys')
+    parser.add_argument('--count', type=int, default=100, help='number of operations of each kind')
+    args = parser.parse_args()
+    run(args.bits, args.count)
@@ -15,7 +15,8 @@
 
 """Module containing encryption methods.
 
-The implementation of the methods in this module is based on the respective PPM methods.
+The implementation of the methods in this module is based on the respective PPM methods. Modular arithmetic runs on
+the backend selected in `arithmetic` (gmpy2 when installed).
 
 Attributes
 ----------
@@ -26,16 +27,28 @@ Attributes
 
 """
 
+import arithmetic
 import fractions
+import multiprocessing
+import Queue
 import random
-import struct
 import sys
+import threading
 
 from binascii import unhexlify
 
 charset = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789~_-+'
 radix_map = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ`~@$^&*()_+=-{}|:<>./? "
-sys.setrecursionlimit(1000000)
+
+# Radix85 numbers are converted 8 digits at a time (85^8 < 2^52), two digits per table lookup. Numbers with more than
+# _SPLIT_DIGITS digits are first split in halves by a power of 85.
+_CHUNK_DIGITS = 8
+_CHUNK = 85 ** _CHUNK_DIGITS
+_SPLIT_DIGITS = 256
+_DIGIT_PAIRS = [radix_map[i // 85] + radix_map[i % 85] for i in range(85 * 85)]
+_PAIR_VALUES = dict((pair, i) for i, pair in enumerate(_DIGIT_PAIRS))
+_DIGIT_VALUES = dict((digit, i) for i, digit in enumerate(radix_map))
+_powers = {}
 random.randrange(-sys.maxint - 1, sys.maxint)
 
 
@@ -139,15 +152,16 @@ def xgcd(a, b):
 
     Returns
     -------
-    int:
-        The extended greatest common divisor for the two given numbers.
+    tuple of (int, int, int)
+        The greatest common divisor g of the two given numbers and the coefficients x and y such that a*x + b*y = g.
 
     """
-    if a == 0:
-        return b, 0, 1
-    else:
-        g, x, y = xgcd(b % a, a)
-        return g, y - (b // a) * x, x
+    x0, x1, y0, y1 = 1, 0, 0, 1
+    while b != 0:
+        q, a, b = a // b, b, a % b
+        x0, x1 = x1, x0 - q * x1
+        y0, y1 = y1, y0 - q * y1
+    return a, x0, y0
 
 
 def mulinv(b, m):
@@ -168,9 +182,10 @@ def mulinv(b, m):
         The modular inverse for b(modulo m).
 
     """
-    g, x, _ = xgcd(b, m)
-    if g == 1:
-        return x % m
+    try:
+        return long(arithmetic.invert(b, m))
+    except ZeroDivisionError:
+        return None
 
 
 def long_to_bytes(value):
@@ -202,8 +217,8 @@ def bytes_to_long(barray):
 
     Parameters
     ----------
-    barray : list of str
-        Byte array to convert.
+    barray : list of int
+        Byte array to convert. Bytes are read as unsigned values.
 
     Returns
     -------
@@ -214,7 +229,7 @@ def bytes_to_long(barray):
     result = 0L
     for i in range(0, len(barray)):
         result = result << 8
-        result += barray[i]
+        result += barray[i] & 0xFF
     return result
 
 
@@ -231,15 +246,11 @@ def divrem(x, y):
     Returns
     -------
     int
-        Remainder of `x`/`y`.
+        Remainder of `x`/`y`, with the sign of `x`.
 
     """
-    signx = 1 if x >= 0 else -1
-    x = abs(x)
-    y = abs(y)
-    q = int(x / y)
-    r = x - (q * y)
-    return signx * r
+    r = abs(x) % abs(y)
+    return r if x >= 0 else -r
 
 
 def long_to_radix85(b):
@@ -248,21 +259,26 @@ def long_to_radix85(b):
     Parameters
     ----------
     b : int
-        Number to convert.
+        Non-negative number to convert.
 
     Returns
     -------
     str
-        Number encoded to string.
+        Number encoded to string. Zero is encoded as an empty string.
+
+    Raises
+    ------
+    ValueError
+        If `b` is negative.
 
     """
-    radix = len(radix_map)
-    buf = ''
-    while b.bit_length() != 0:
-        d = divrem(b, radix)
-        buf = radix_map[d] + buf
-        b /= radix
-    return buf
+    if b < 0:
+        raise ValueError('Cannot encode a negative number: %d.' % b)
+    if b == 0:
+        return ''
+    # 85 > 2^6.4, so a number of n bits has at most n / 6.4 + 1 digits.
+    width = int(b.bit_length() / 6.4) + 1
+    return _encode_radix85(b, width).lstrip(radix_map[0])
 
 
 def radix85_to_long(s):
@@ -278,14 +294,100 @@ def radix85_to_long(s):
     int
         String decoded to number.
 
+    Raises
+    ------
+    RuntimeError
+        If `s` contains a character that is not a Base85 digit.
+
+    """
+    try:
+        return _decode_radix85(s)
+    except KeyError:
+        for c in s:
+            if c not in _DIGIT_VALUES:
+                raise RuntimeError('Not a radix85 character: %s.' % c)
+        raise
+
+
+def longs_to_radix85(values):
+    """Encodes several numbers into Base85 strings.
+
+    Parameters
+    ----------
+    values : list of int
+        Non-negative numbers to convert.
+
+    Returns
+    -------
+    list of str
+        Numbers encoded to strings, in the order of `values`.
+
+    """
+    return [long_to_radix85(value) for value in values]
+
+
+def radix85_to_longs(texts):
+    """Decodes several Base85 strings into numbers.
+
+    Parameters
+    ----------
+    texts : list of str
+        The encoded strings.
+
+    Returns
+    -------
+    list of int
+        Strings decoded to numbers, in the order of `texts`.
+
     """
+    return [radix85_to_long(text) for text in texts]
+
+
+def _power(digits):
+    power = _powers.get(digits)
+    if power is None:
+        power = _powers[digits] = 85 ** digits
+    return power
+
+
+def _encode_radix85(b, width):
+    """Encodes a number lower than 85^`width` into exactly `width` digits.
+
+    """
+    if width > _SPLIT_DIGITS:
+        low_width = width // 2
+        high, low = divmod(b, _power(low_width))
+        return _encode_radix85(high, width - low_width) + _encode_radix85(low, low_width)
+
+    chunks = []
+    for i in range(0, width, _CHUNK_DIGITS):
+        b, r = divmod(b, _CHUNK)
+        r, d0 = divmod(int(r), 7225)
+        r, d1 = divmod(r, 7225)
+        d3, d2 = divmod(r, 7225)
+        chunks += [_DIGIT_PAIRS[d3] + _DIGIT_PAIRS[d2] + _DIGIT_PAIRS[d1] + _DIGIT_PAIRS[d0]]
+    chunks.reverse()
+    return ''.join(chunks)[-width:]
+
+
+def _decode_radix85(s):
+    """Decodes a Base85 string. Raises KeyError for invalid characters.
+
+    """
+    if len(s) > _SPLIT_DIGITS:
+        low_width = len(s) // 2
+        return _decode_radix85(s[:-low_width]) * _power(low_width) + _decode_radix85(s[-low_width:])
+
     b = 0
-    r85 = 85
-    for i in range(0, len(s)):
-        n = radix_map.find(s[i])
-        if n < 0:
-            raise RuntimeError('Not a radix85 character: %s.' % s[i])
-        b = (b * r85) + n
+    start = len(s) % _CHUNK_DIGITS or _CHUNK_DIGITS
+    for end in range(start, len(s) + 1, _CHUNK_DIGITS):
+        chunk = s[end - _CHUNK_DIGITS if end > start else 0:end]
+        i = len(chunk) % 2
+        v = _DIGIT_VALUES[chunk[0]] if i else 0
+        while i < len(chunk):
+            v = v * 7225 + _PAIR_VALUES[chunk[i:i + 2]]
+            i += 2
+        b = b * _power(len(chunk)) + v
     return b
 
 
@@ -315,7 +417,7 @@ def findk(p):
     return k
 
 
-def encrypt_block(encoded_bytes, offset, public_key):
+def encrypt_block(encoded_bytes, offset, public_key, length=None):
     """Encrypts given encoded bytes using given public key.
 
     Parameters
@@ -326,6 +428,8 @@ def encrypt_block(encoded_bytes, offset, public_key):
         Offset to start encryption.
     public_key : :obj:`PublicKey`
         ElGamal public key to use.
+    length : int, optional
+        Length of the block to encrypt. Default is None (all bytes from `offset`).
 
     Returns
     -------
@@ -333,12 +437,12 @@ def encrypt_block(encoded_bytes, offset, public_key):
         Encrypted text.
 
     """
-    block = encoded_bytes[offset:]
+    block = encoded_bytes[offset:offset + length] if length is not None else encoded_bytes[offset:]
     t = bytes_to_long(block)
     k = findk(public_key.p)
-    a = pow(public_key.g, k, public_key.p)
-    b = divrem(pow(public_key.y, k, public_key.p) * t, public_key.p)
-    return long_to_radix85(a) + ',' + long_to_radix85(b)
+    a = arithmetic.powmod(public_key.g, k, public_key.p)
+    b = arithmetic.powmod(public_key.y, k, public_key.p) * t % public_key.p
+    return ','.join(longs_to_radix85([long(a), long(b)]))
 
 
 def decrypt_block(encrypted_text, length, private_key):
@@ -355,25 +459,20 @@ def decrypt_block(encrypted_text, length, private_key):
 
     Returns
     -------
-    list of str
-        Decrypted byte array.
+    str
+        Decrypted bytes, left padded with zeros to `length`.
 
     """
-    tokens = encrypted_text.split(',')
-    a = radix85_to_long(tokens[0])
-    b = radix85_to_long(tokens[1])
+    a, b = radix85_to_longs(encrypted_text.split(',')[:2])
 
-    x = private_key.x
+    # p is prime, so a^-x = a^(p-1-x) (mod p) and no modular inverse is needed.
     p = private_key.p
-    d = divrem((b * (mulinv(pow(a, x, p), p))), p)
+    d = long(b * arithmetic.powmod(a, (p - 1 - private_key.x) % (p - 1), p) % p)
     barray = long_to_bytes(d)
 
     if len(barray) > length:
-        block = barray[-length:]
-    else:
-        block = [0] * (length - len(barray))
-        block += barray[:]
-    return block
+        return barray[-length:]
+    return '\x00' * (length - len(barray)) + barray
 
 
 def twos_comp(n, b):
@@ -402,13 +501,12 @@ def twos_comp(n, b):
     return n
 
 
-# noinspection PyTypeChecker
 def utf_to_str(barray):
     """Decodes an UTF byte array into a string
 
     Parameters
     ----------
-    barray : list of str
+    barray : str
         Byte array to decode.
 
     Returns
@@ -417,36 +515,34 @@ def utf_to_str(barray):
         Decoded string.
 
     """
-    buf = ''
-    padding = ord(barray[-1])
-    for i in range(0, len(barray) - 1):
-        padding = divrem((padding - ord(barray[i]) - 256), 256)
-    if padding < 0:
-        padding += 256
+    data = bytearray(barray)
+    padding = (data[-1] - sum(data[:-1])) % 256
+    data = data[0: len(data) - padding]
+    buf = []
     i = 0
-    data = barray[0: len(barray) - padding]
-    while i < len(data):
-        c = struct.unpack('B', data[i])[0]
-        i += 1
-        if c < 0:
-            break
-        if (c >> 4) in range(0, 8):
-            buf += chr(c)
-        elif (c >> 4) in range(12, 14):
-            char2 = struct.unpack('B', data[i])[0]
+    try:
+        while i < len(data):
+            c = data[i]
             i += 1
-            if (char2 & 0xC0) != 128:
-                raise RuntimeError('Bad UTF.')
-            buf += chr(((c & 0x1F) << 6 | char2 & 0x3F))
-        elif (c >> 4) == 14:
-            char2 = struct.unpack('B', data[i])[0]
-            char3 = struct.unpack('B', data[i + 1])[0]
-            i += 2
-            if ((char2 & 0xC0) != 128) or ((char3 & 0xC0) != 128):
+            if (c >> 4) < 8:
+                buf += [chr(c)]
+            elif (c >> 4) in (12, 13):
+                char2 = data[i]
+                i += 1
+                if (char2 & 0xC0) != 128:
+                    raise RuntimeError('Bad UTF.')
+                buf += [chr(((c & 0x1F) << 6 | char2 & 0x3F))]
+            elif (c >> 4) == 14:
+                char2 = data[i]
+                char3 = data[i + 1]
+                i += 2
+                if ((char2 & 0xC0) != 128) or ((char3 & 0xC0) != 128):
+                    raise RuntimeError('Bad UTF.')
+                buf += [chr(((c & 0xF) << 12 | (char2 & 0x3F) << 6 | (char3 & 0x3F) << 0))]
+            else:
                 raise RuntimeError('Bad UTF.')
-            buf += chr(((c & 0xF) << 12 | (char2 & 0x3F) << 6 | (char3 & 0x3F) << 0))
-        else:
-            raise RuntimeError('Bad UTF.')
+    except IndexError:
+        raise RuntimeError('Bad UTF.')
     return ''.join(buf)
 
 
@@ -483,7 +579,7 @@ def str_to_utf(s, block_length):
     if padding == 0:
         padding = block_length
 
-    barray = b[:] + ([0] * (block_length - len(b)))
+    barray = b[:] + ([0] * padding)
     for i in range(0, len(b)):
         padding = divrem((padding + b[i] + 256), 256)
         barray[-1] = twos_comp(padding, 8)
@@ -513,7 +609,7 @@ def encrypt(encoded_text, public_key):
         for i in range(0, len(plain_bytes), block_length):
             if i != 0:
                 result += ';'
-            result += encrypt_block(plain_bytes, i, public_key)
+            result += encrypt_block(plain_bytes, i, public_key, block_length)
     return result
 
 
@@ -536,12 +632,8 @@ def decrypt(encrypted_text, private_key):
     result = ''
     if encrypted_text is not None and len(encrypted_text) > 0:
         block_length = min(127, private_key.bit_length / 8)
-        # noinspection SpellCheckingInspection
-        byteout = []
-        for token in encrypted_text.split(';'):
-            block = decrypt_block(token, block_length, private_key)
-            byteout += block
-        result = utf_to_str(byteout)
+        blocks = [decrypt_block(token, block_length, private_key) for token in encrypted_text.split(';')]
+        result = utf_to_str(''.join(blocks))
     return result
 
 
@@ -646,3 +738,220 @@ def decrypt2(encrypted_text, private_key):
     if encrypted_text is not None and len(encrypted_text) > 0:
         result = decode(decrypt(encrypted_text, private_key))
     return result
+
+
+def decrypt_many(encrypted_texts, private_key, processes=1):
+    """Decrypts several encrypted texts using given private key.
+
+    Parameters
+    ----------
+    encrypted_texts : list of str
+        Texts to decrypt.
+    private_key : :[obj]:`PrivateKey`
+        ElGamal private key to use.
+    processes : int, optional
+        Number of worker processes. If None, the number of CPUs is used. Default is 1 (texts are decrypted in the
+        calling process).
+
+    Returns
+    -------
+    list of str
+        Decrypted texts, in the order of `encrypted_texts`.
+
+    """
+    encrypted_texts = list(encrypted_texts)
+    if processes == 1 or len(encrypted_texts) < 2:
+        return [decrypt2(text, private_key) for text in encrypted_texts]
+
+    processes = processes or multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(processes)
+    try:
+        chunk_size = max(1, len(encrypted_texts) // (processes * 4))
+        return pool.map(_decrypt2, [(text, private_key) for text in encrypted_texts], chunk_size)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _decrypt2(args):
+    return decrypt2(*args)
+
+
+class FixedBasePower(object):
+    """Modular exponentiation of a fixed base with precomputed tables.
+
+    The exponent is split into windows of `window` bits. The power of the base for every value of every window is
+    computed once, so each exponentiation takes one multiplication per window instead of a square and multiply per
+    bit.
+
+    Parameters
+    ----------
+        base : int
+            Base of the exponentiation.
+        p : int
+            Modulus.
+        bit_length : int
+            Maximum bit length of the exponents.
+        window : int, optional
+            Number of exponent bits per table. Tables hold 2^`window` numbers each. Default is 6.
+
+    """
+
+    def __init__(self, base, p, bit_length, window=6):
+        self.base = base
+        self.p = p
+        self.bit_length = bit_length
+        self.window = window
+        self.tables = []
+        base = arithmetic.mpz(base)
+        for i in range(0, bit_length, window):
+            table = [arithmetic.mpz(1)] * (1 << window)
+            for j in range(1, 1 << window):
+                table[j] = table[j - 1] * base % p
+            self.tables += [table]
+            base = table[-1] * base % p
+
+    def pow(self, e):
+        """Returns base^`e` (mod p).
+
+        Parameters
+        ----------
+        e : int
+            Non-negative exponent, with at most `bit_length` bits.
+
+        Returns
+        -------
+        :obj:`object`
+            Result of the exponentiation, as a number of the `arithmetic` backend integer type.
+
+        """
+        if e.bit_length() > self.bit_length:
+            return arithmetic.powmod(self.base, e, self.p)
+        mask = (1 << self.window) - 1
+        p = self.p
+        result = 1
+        for table in self.tables:
+            if e == 0:
+                break
+            d = e & mask
+            if d:
+                result = result * table[d] % p
+            e >>= self.window
+        return result
+
+
+class Encryptor(object):
+    """ElGamal encryptor for a fixed public key.
+
+    Powers of g and y are computed with tables built once for the key (see `FixedBasePower`). Optionally, a
+    background thread keeps a pool of (g^k, y^k) pairs ready, so encrypting a block costs one multiplication when the
+    pool is not empty.
+
+    Parameters
+    ----------
+        public_key : :[obj]:`PublicKey`
+            ElGamal public key to use.
+        window : int, optional
+            Number of exponent bits per table. Default is 6.
+        pool_size : int, optional
+            Number of pairs generated in background. Default is 0 (pairs are generated when needed).
+
+    Attributes
+    ----------
+        public_key : :[obj]:`PublicKey`
+            ElGamal public key used.
+
+    """
+
+    def __init__(self, public_key, window=6, pool_size=0):
+        self.public_key = public_key
+        bit_length = public_key.p.bit_length()
+        self._g = FixedBasePower(public_key.g, public_key.p, bit_length, window)
+        self._y = FixedBasePower(public_key.y, public_key.p, bit_length, window)
+        self._pairs = None
+        self._closed = threading.Event()
+        if pool_size > 0:
+            self._pairs = Queue.Queue(pool_size)
+            thread = threading.Thread(target=self.__fill)
+            thread.daemon = True
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def encrypt_block(self, encoded_bytes, offset, length=None):
+        """Encrypts given encoded bytes. See `encrypt_block`.
+
+        """
+        t = bytes_to_long(encoded_bytes[offset:offset + length] if length is not None else encoded_bytes[offset:])
+        a, yk = self.__pair()
+        b = yk * t % self.public_key.p
+        return ','.join(longs_to_radix85([long(a), long(b)]))
+
+    def encrypt(self, encoded_text):
+        """Encrypts given encoded text. See `encrypt`.
+
+        """
+        result = ''
+        if encoded_text is not None and len(encoded_text) > 0:
+            block_length = min(127, self.public_key.bit_length / 8)
+            plain_bytes = str_to_utf(encoded_text, block_length)
+            result = ';'.join([self.encrypt_block(plain_bytes, i, block_length)
+                               for i in range(0, len(plain_bytes), block_length)])
+        return result
+
+    def encrypt2(self, plain_text):
+        """Encrypts given plain text. See `encrypt2`.
+
+        """
+        result = ''
+        if plain_text is not None and len(plain_text) > 0:
+            result = self.encrypt(encode(plain_text))
+        return result
+
+    def encrypt_many(self, plain_texts):
+        """Encrypts several plain texts.
+
+        Parameters
+        ----------
+        plain_texts : list of str
+            Plain texts to encrypt.
+
+        Returns
+        -------
+        list of str
+            Encrypted texts, in the order of `plain_texts`.
+
+        """
+        return [self.encrypt2(text) for text in plain_texts]
+
+    def close(self):
+        """Stops generating pairs in background.
+
+        """
+        self._closed.set()
+
+    def __pair(self):
+        if self._pairs is not None:
+            try:
+                return self._pairs.get_nowait()
+            except Queue.Empty:
+                pass
+        return self.__new_pair()
+
+    def __new_pair(self):
+        k = findk(self.public_key.p)
+        return self._g.pow(k), self._y.pow(k)
+
+    def __fill(self):
+        while not self._closed.is_set():
+            pair = self.__new_pair()
+            while not self._closed.is_set():
+                try:
+                    self._pairs.put(pair, True, 0.5)
+                    break
+                except Queue.Full:
+                    pass
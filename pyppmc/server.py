@@ -17,7 +17,9 @@
 
 """
 
+import collections
 import csv
+import datetime
 import notification
 import os
 import re
@@ -28,6 +30,78 @@ import urllib
 import urlparse
 import util
 
+from transport import Transport
+from util import batch, columnar
+
+QUERY_DATE_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d']
+"""Formats of date values coerced by `Server.iter_query`."""
+QUERY_CHUNK_SIZE = 64 * 1024
+"""Number of bytes read at a time from streamed query results."""
+PAGE_ROW_NUMBER_COLUMN = 'PYPPMC_RN'
+"""Name of the row number column added to paged queries."""
+
+
+def _paginate(sql, first, last):
+    """Wraps a SQL query in a ROWNUM envelope returning rows `first` + 1 to `last`.
+
+    The row number is added as the last column of the result.
+
+    """
+    sql = sql.strip().rstrip(';')
+    return """\
+SELECT *
+FROM   (SELECT q.*,
+               ROWNUM %s
+        FROM   (%s) q
+        WHERE  ROWNUM <= %d)
+WHERE  %s > %d""" % (PAGE_ROW_NUMBER_COLUMN, sql, last, PAGE_ROW_NUMBER_COLUMN, first)
+
+
+def _iter_lines(chunks):
+    """Splits a stream of byte chunks into lines, keeping line endings.
+
+    Unlike `requests.Response.iter_lines`, only '\\n' ends a line, so carriage returns and other line breaks inside
+    quoted CSV values are preserved.
+
+    """
+    pending = ''
+    for chunk in chunks:
+        lines = (pending + chunk).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    if pending != '':
+        yield pending
+
+
+def _normalize_sql(sql):
+    """Collapses whitespace outside quoted literals and strips trailing semicolons of a SQL query.
+
+    """
+    parts = re.split(r"('(?:[^']|'')*')", sql.strip().rstrip(';').strip())
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r'\s+', ' ', parts[i])
+    return ''.join(parts)
+
+
+def _coerce(value):
+    """Converts a query result value to int, float, datetime or None, if it looks like one.
+
+    """
+    if value == '':
+        return None
+    if re.match(r'^-?(0|[1-9][0-9]*)$', value):
+        return int(value)
+    if re.match(r'^-?[0-9]*\.[0-9]+([eE][-+]?[0-9]+)?$', value):
+        return float(value)
+    if re.match(r'^[0-9]{4}-[0-9]{2}-[0-9]{2}', value):
+        for fmt in QUERY_DATE_FORMATS:
+            try:
+                return datetime.datetime.strptime(value, fmt)
+            except ValueError:
+                pass
+    return value
+
 
 class ServerNode:
     """Server node on application server.
@@ -61,6 +135,8 @@ class Server:
     ----------
     session : :obj:`Session`
         Current user session.
+    query_cache : :obj:`LRUCache` or :obj:`FileCache`, optional
+        Cache of `run_query` results. Default is None (results are not cached).
 
     Attributes
     ----------
@@ -68,6 +144,9 @@ class Server:
         Current user session.
     server_nodes : :obj:`dict` of str : :obj:`ServerNode`
         Application server nodes.
+    query_cache : :obj:`LRUCache` or :obj:`FileCache`
+        Cache of `run_query` results, keyed by server base URL and whitespace-normalized SQL. Its `hits` and `misses`
+        attributes count cache lookups.
 
     """
     SECURITY_LOGON_PAGE = '/itg/web/knta/global/Logon.jsp'
@@ -82,17 +161,7 @@ class Server:
         """str: Application server base URL.
 
         """
-        base_url = None
-        for cookie in self.session.http_session.cookies:
-            if cookie.name == 'JSESSIONID' and cookie.path == '/itg/':
-                if cookie.secure:
-                    protocol = 'https'
-                    port = 443 if cookie.port is None else cookie.port
-                else:
-                    protocol = 'http'
-                    port = 80 if cookie.port is None else cookie.port
-                domain = cookie.domain
-                base_url = '%s://%s:%d' % (protocol, domain, port)
+        base_url = self.session.base_url
         if base_url is not None:
             return base_url
         else:
@@ -110,10 +179,21 @@ class Server:
                 self._public_key = security.get_public_key(public_key_file)
             else:
                 raise RuntimeError('Public key file not found.')
+        return self._public_key
 
     @public_key.setter
     def public_key(self, value):
         self._public_key = value
+        self._encryptor = None
+
+    @property
+    def encryptor(self):
+        """:obj:`elgamal.Encryptor`: Encryptor built once for `public_key`, for bulk encryption.
+
+        """
+        if self._encryptor is None:
+            self._encryptor = security.Encryptor(self.public_key)
+        return self._encryptor
 
     @property
     def private_key(self):
@@ -124,23 +204,26 @@ class Server:
             base_path = self.get_param('BASE_PATH')
             private_key_file = os.path.abspath(base_path + '/security/private_key.txt')
             if os.path.isfile(private_key_file):
-                self._public_key = security.get_private_key(private_key_file)
+                self._private_key = security.get_private_key(private_key_file)
             else:
                 raise RuntimeError('Private key file not found.')
+        return self._private_key
 
     @private_key.setter
     def private_key(self, value):
         self._private_key = value
 
-    def __init__(self, session):
+    def __init__(self, session, query_cache=None):
         self.session = session
+        self.query_cache = query_cache
         self.server_nodes = {}
         self._load_config()
         self._public_key = None
         self._private_key = None
+        self._encryptor = None
 
     @staticmethod
-    def get_languages(url):
+    def get_languages(url, transport=None):
         """
         Get list of available languages.
 
@@ -150,6 +233,9 @@ class Server:
         ----------
         url : str
             Application server URL.
+        transport : :obj:`Transport`, optional
+            HTTP transport settings (connection pool, retries, compression). Default is a `Transport` with default
+            settings.
 
         Returns
         -------
@@ -163,7 +249,11 @@ class Server:
 
         """
         logon_page = urlparse.urljoin(url, Server.SECURITY_LOGON_PAGE)
-        response = requests.get(logon_page, verify=False)
+        http_session = (transport if transport is not None else Transport()).session()
+        try:
+            response = http_session.get(logon_page, verify=False)
+        finally:
+            http_session.close()
         if response.status_code != requests.codes.ok:
             raise RuntimeError('Failed to connect to server.')
 
@@ -176,6 +266,9 @@ class Server:
     def encrypt(self, text):
         """Encrypts given text using PPM encoding functions.
 
+        One-off encryption does not build `encryptor`, whose precomputed tables only pay off over many texts (see
+        `encrypt_many`).
+
         Parameters
         ----------
         text : str
@@ -189,6 +282,22 @@ class Server:
         """
         return security.encrypt(text, self.public_key)
 
+    def encrypt_many(self, texts):
+        """Encrypts several texts using PPM encoding functions, with `encryptor`.
+
+        Parameters
+        ----------
+        texts : list of str
+            The texts to be encrypted.
+
+        Returns
+        -------
+        list of str
+            The encrypted texts, in the order of `texts`.
+
+        """
+        return self.encryptor.encrypt_many(texts)
+
     def download_file(self, filename):
         """Downloads a file from application server.
 
@@ -221,6 +330,21 @@ class Server:
     def _load_config(self):
         """Loads server parameters from configuration file.
 
+        The configuration is loaded once per session. If the session belongs to a session store, it is stored too.
+
+        """
+        if getattr(self.session, 'server_nodes', None) is not None:
+            self.server_nodes = dict(self.session.server_nodes)
+            return
+
+        self._parse_config()
+        self.session.server_nodes = dict(self.server_nodes)
+        if getattr(self.session, 'store', None) is not None:
+            self.session.store.save(self.session)
+
+    def _parse_config(self):
+        """Downloads and parses the configuration file.
+
         """
         response = self.download_file('/server.conf')
         config = StringIO.StringIO(response)
@@ -369,27 +493,105 @@ class Server:
             Query results on the given format.
 
         """
-        if sql is None or sql.strip() == '':
-            raise ValueError('Invalid SQL query.')
-        if fmt not in ['txt', 'csv']:
-            raise ValueError("Invalid format: %s. Valid formats are 'txt' and csv.")
-        data = {
-            'sql': sql,
-            'format': fmt
-        }
-        base_url = self.get_param('BASE_URL')
-        url = urlparse.urljoin(base_url, '/itg/web/gwt/adminconsole/sqlrunnerexport')
-        response = self.session.http_session.post(url, data, verify=False)
+        response = self._post_export(sql, fmt)
         result = response.content.decode(response.encoding).encode('utf-8')
         return result
 
-    def run_query(self, sql):
+    def iter_query(self, sql, named=False, coerce=False):
+        """Runs a SQL query and yields its results one row at a time.
+
+        The export is streamed from the application server and parsed as it arrives, so memory usage does not depend
+        on the number of rows.
+
+        Parameters
+        ----------
+        sql : str
+            SQL query to run.
+        named : bool, optional
+            Flag to indicate if rows must be yielded as namedtuples with fields named after the query columns. Column
+            names that are not valid identifiers are replaced by positional names (_0, _1, ...). Default is False.
+        coerce : bool, optional
+            Flag to indicate if values must be converted to int, float or datetime when they look like one. Empty
+            values are converted to None. Default is False (all values are str).
+
+        Yields
+        ------
+        list of str or namedtuple
+            Column values of each row. The header row is not yielded.
+
+        """
+        rows = self._iter_csv(sql)
+        header = next(rows, None)
+        if header is not None:
+            row_type = collections.namedtuple('Row', header, rename=True) if named else None
+            for row in self._convert_rows(rows, row_type, coerce):
+                yield row
+
+    def iter_query_paged(self, sql, page_size=10000, concurrency=1, named=False, coerce=False, target_latency=10.0,
+                         min_page_size=100, max_page_size=200000):
+        """Runs a SQL query page by page and yields its results one row at a time.
+
+        The query is wrapped in a ROWNUM envelope and each page is exported separately, so the application server
+        never has to produce the whole result at once. The size of the next pages is adjusted so that each export
+        takes about `target_latency` seconds. Pages are yielded in order, as a single sequence of rows.
+
+        Parameters
+        ----------
+        sql : str
+            SQL query to run. It must have an ORDER BY clause that gives a stable row order, otherwise rows may be
+            repeated or skipped between pages. Columns must have unique names.
+        page_size : int, optional
+            Number of rows of the first page. Default is 10000.
+        concurrency : int, optional
+            Maximum number of pages exported at the same time. Default is 1 (pages are exported sequentially).
+        named : bool, optional
+            Flag to indicate if rows must be yielded as namedtuples. Default is False.
+        coerce : bool, optional
+            Flag to indicate if values must be converted to int, float or datetime when they look like one. Default
+            is False.
+        target_latency : float, optional
+            Desired export time of a page, in seconds. Default is 10.
+        min_page_size : int, optional
+            Minimum number of rows per page. Default is 100.
+        max_page_size : int, optional
+            Maximum number of rows per page. Default is 200000.
+
+        Yields
+        ------
+        list of str or namedtuple
+            Column values of each row. See `iter_query`.
+
+        """
+        page_size = batch.AdaptiveBatchSize(page_size, min_page_size, max_page_size, target_latency)
+
+        def fetch(offset, size):
+            rows = self._iter_csv(_paginate(sql, offset, offset + size))
+            header = next(rows, None)
+            return header, [row[:-1] for row in rows]
+
+        row_type = None
+        for offset, size, (page_header, page) in batch.adaptive_dispatch(fetch, page_size, concurrency):
+            if page_header is None:
+                break
+            if named and row_type is None:
+                row_type = collections.namedtuple('Row', page_header[:-1], rename=True)
+            for row in self._convert_rows(page, row_type, coerce):
+                yield row
+            if len(page) < size:
+                break
+
+    def run_query(self, sql, ttl=None):
         """Runs a SQL query and returns its results.
 
+        If the server has a `query_cache`, results are returned from the cache when the same query (ignoring
+        differences in whitespace) was run before on the same server.
+
         Parameters
         ----------
         sql : str
             SQL query to run.
+        ttl : float, optional
+            Seconds the results are kept in `query_cache`. Default is the cache `ttl`.
 
         Returns
         -------
@@ -398,14 +600,101 @@ class Server:
             contains all column values. `run_query` does not differentiate column types; all data is returned as str.
 
         """
-        result = []
-        exp = StringIO.StringIO(self.export_query(sql, 'csv'))
-        reader = csv.reader(exp)
-        entry = []
-        for row in reader:
-            if reader.line_num > 1:
-                for column in row:
-                    entry += [column]
-                result += [row]
-        exp.close()
+        if self.query_cache is None:
+            return list(self.iter_query(sql))
+
+        key = (self.get_param('BASE_URL'), _normalize_sql(sql))
+        result = self.query_cache.get(key)
+        if result is None:
+            result = list(self.iter_query(sql))
+            self.query_cache.set(key, result, ttl)
+        return [list(row) for row in result]
+
+    def run_query_columnar(self, sql):
+        """Runs a SQL query and returns its results column by column.
+
+        Rows are parsed as they are streamed from the application server and appended to typed columns, so no list
+        of rows is built. Numeric columns are stored in `array.array` objects (see `util.columnar.Column`).
+
+        Parameters
+        ----------
+        sql : str
+            SQL query to run.
+
+        Returns
+        -------
+        :obj:`ColumnarResult`
+            Query results. Columns are accessed by name or position, e.g. ``sum(result['AMOUNT'])``.
+
+        """
+        rows = self._iter_csv(sql)
+        result = columnar.ColumnarResult(next(rows, []))
+        for row in rows:
+            result.append(row)
         return result
+
+    def _iter_csv(self, sql):
+        """Streams the results of a SQL query exported as csv.
+
+        Parameters
+        ----------
+        sql : str
+            SQL query to run.
+
+        Yields
+        ------
+        list of str
+            Header row, then the column values of each row.
+
+        """
+        response = self._post_export(sql, 'csv', stream=True)
+        try:
+            encoding = response.encoding or 'utf-8'
+            lines = (line.decode(encoding).encode('utf-8')
+                     for line in _iter_lines(response.iter_content(QUERY_CHUNK_SIZE)))
+            for row in csv.reader(lines):
+                yield row
+        finally:
+            response.close()
+
+    @staticmethod
+    def _convert_rows(rows, row_type, coerce):
+        """Converts csv rows to the types requested from `iter_query`.
+
+        Rows are yielded as lists if `row_type` is None, otherwise as instances of the `row_type` namedtuple.
+
+        """
+        for row in rows:
+            if coerce:
+                row = [_coerce(value) for value in row]
+            yield row if row_type is None else row_type._make(row)
+
+    def _post_export(self, sql, fmt, stream=False):
+        """Posts a SQL query to application server SQL Runner export.
+
+        Parameters
+        ----------
+        sql : str
+            SQL query to run.
+        fmt : str
+            Format to export query results.
+        stream : bool, optional
+            Flag to indicate if the response body must be streamed instead of downloaded at once. Default is False.
+
+        Returns
+        -------
+        :obj:`requests.Response`
+            Response containing query results on the given format.
+
+        """
+        if sql is None or sql.strip() == '':
+            raise ValueError('Invalid SQL query.')
+        if fmt not in ['txt', 'csv']:
+            raise ValueError("Invalid format: %s. Valid formats are 'txt' and csv.")
+        data = {
+            'sql': sql,
+            'format': fmt
+        }
+        base_url = self.get_param('BASE_URL')
+        url = urlparse.urljoin(base_url, '/itg/web/gwt/adminconsole/sqlrunnerexport')
+        return self.session.http_session.post(url, data, verify=False, stream=stream)
@@ -21,11 +21,150 @@ Module for user session methods.
 
 """
 
+import contextlib
+import json
 import requests
+import threading
+import time
 import urlparse
 import util
+import weakref
 
-from server import Server
+from server import Server, ServerNode
+from transport import HTTPSession, Transport, get_base_url
+from util.cache import FileCache
+
+
+class SessionStore(FileCache):
+    """Store of authenticated sessions shared by processes.
+
+    The cookie jar, base URL and server configuration of each session are kept in a directory, keyed by application
+    server URL, username and language, so new `Session` objects can resume them instead of logging on again. Entries
+    are stored as JSON (never pickled), so a tampered file can at worst hold an invalid session. Entry files are
+    created readable only by their owner, but anyone who can read them can use the stored sessions.
+
+    Parameters
+    ----------
+    path : str
+        Directory where sessions are stored. Created if it does not exist.
+    ttl : float, optional
+        Seconds a session is kept. Should be shorter than the session timeout of the application server. Default is
+        1800.
+    max_size : int, optional
+        Maximum number of stored sessions. Default is 1024.
+
+    """
+
+    def __init__(self, path, ttl=1800, max_size=1024):
+        FileCache.__init__(self, path, max_size, ttl)
+
+    def load(self, url, username, language):
+        """Returns a stored session.
+
+        Parameters
+        ----------
+        url : str
+            Application server URL.
+        username : str
+            Username of the session.
+        language : str
+            Language of the session.
+
+        Returns
+        -------
+        dict of str : :obj:`object`
+            Cookie jar ('cookies'), base URL ('base_url') and server nodes ('server_nodes') of the session, or None
+            if no valid session is stored.
+
+        """
+        entry = self.get((url, username, language))
+        if entry is None:
+            return None
+        try:
+            cookies = requests.cookies.RequestsCookieJar()
+            for cookie in entry['cookies']:
+                cookies.set_cookie(requests.cookies.create_cookie(**cookie))
+            server_nodes = None
+            if entry['server_nodes'] is not None:
+                server_nodes = dict((name, ServerNode(name, params)) for name, params in entry['server_nodes'].items())
+            return {
+                'cookies': cookies,
+                'base_url': entry['base_url'],
+                'server_nodes': server_nodes
+            }
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return None
+
+    def save(self, session):
+        """Stores a session.
+
+        Parameters
+        ----------
+        session : :obj:`Session`
+            An authenticated session.
+
+        """
+        server_nodes = None
+        if session.server_nodes is not None:
+            server_nodes = dict((name, node.params) for name, node in session.server_nodes.items())
+        entry = {
+            'cookies': [_cookie_to_dict(cookie) for cookie in session.http_session.cookies],
+            'base_url': session.base_url,
+            'server_nodes': server_nodes
+        }
+        self.set((session.url, session.username, session.language), entry)
+
+    def remove(self, session):
+        """Removes a stored session.
+
+        Parameters
+        ----------
+        session : :obj:`Session`
+            A session previously stored.
+
+        """
+        self.invalidate((session.url, session.username, session.language))
+
+    def _dump(self, entry, f):
+        json.dump(entry, f)
+
+    def _load(self, f):
+        key, value, expires = _from_json(json.load(f))
+        return tuple(key), value, expires
+
+
+def _cookie_to_dict(cookie):
+    """Returns the arguments of `requests.cookies.create_cookie` that rebuild the given cookie.
+
+    """
+    return {
+        'version': cookie.version,
+        'name': cookie.name,
+        'value': cookie.value,
+        'port': cookie.port,
+        'domain': cookie.domain,
+        'path': cookie.path,
+        'secure': cookie.secure,
+        'expires': cookie.expires,
+        'discard': cookie.discard,
+        'comment': cookie.comment,
+        'comment_url': cookie.comment_url,
+        'rest': cookie._rest,
+        'rfc2109': cookie.rfc2109
+    }
+
+
+def _from_json(value):
+    """Converts the unicode strings of a decoded JSON value to UTF-8 encoded str.
+
+    """
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    elif isinstance(value, list):
+        return [_from_json(item) for item in value]
+    elif isinstance(value, dict):
+        return dict((_from_json(key), _from_json(item)) for key, item in value.items())
+    return value
 
 
 class Session:
@@ -43,6 +182,12 @@ class Session:
         Password to log in.
     language : str
         Language used by the user.
+    store : :obj:`SessionStore`, optional
+        Store of authenticated sessions. If given, a stored session is resumed when the server still accepts it, and
+        new sessions are stored. Default is None.
+    transport : :obj:`Transport`, optional
+        HTTP transport settings (connection pool, retries, compression). Default is a `Transport` with default
+        settings.
 
     Attributes
     ----------
@@ -56,6 +201,21 @@ class Session:
         Language used by the user.
     db_con : :[obj]:`Connection`
         Connection to application database.
+    db_pool : :[obj]:`ConnectionPool`
+        Pool of connections to application database. When set, db persisters check out a connection from the pool
+        for each operation instead of using `db_con`.
+    store : :obj:`SessionStore`
+        Store of authenticated sessions.
+    transport : :obj:`Transport`
+        HTTP transport settings.
+    base_url : str
+        Application server base URL, as resolved from the session cookie. Resolved once and cached by
+        `http_session` until the cookie jar changes.
+    server_nodes : dict of str : :obj:`ServerNode`
+        Server configuration loaded by `Server`, shared with other processes through `store`.
+    auto_logout : bool
+        Flag to indicate if the session is logged out when the object is destroyed. Default is False for stored
+        sessions (so other processes can resume them) and True otherwise.
 
     Raises
     ------
@@ -66,12 +226,43 @@ class Session:
 
     """
 
-    def __init__(self, url, username, password, language):
+    def __init__(self, url, username, password, language, store=None, transport=None):
         self.url = url
         self.username = username
         self.password = password
         self.language = language
-        http_session = requests.Session()
+        self.store = store
+        self.transport = transport if transport is not None else Transport()
+        self.auto_logout = store is None
+        self.server_nodes = None
+
+        # TODO Implement logic to get information about the authenticated user.
+        self.auth_user = None
+
+        # TODO Implement logic to build a database connection using default Server properties.
+        self.db_con = None
+        self.db_pool = None
+
+        if store is not None and self.__resume(store.load(url, username, language)):
+            return
+        self.__logon()
+        if store is not None:
+            store.save(self)
+
+    @property
+    def base_url(self):
+        http_session = getattr(self, 'http_session', None)
+        if http_session is None:
+            return None
+        if isinstance(http_session, HTTPSession):
+            return http_session.base_url
+        return get_base_url(http_session.cookies)
+
+    def __logon(self):
+        """Logs onto the application server.
+
+        """
+        http_session = self.transport.session()
 
         # Required to call SOAP web services
         http_session.auth = (self.username, self.password)
@@ -80,13 +271,13 @@ class Session:
         if response.status_code != requests.codes.ok:
             raise RuntimeError('Failed to connect to server.')
 
-        content = response.content.decode('utf-8')
-        langs = util.html.xpath(content, "//select[@id='field-language']/option/@value")
+        tree = util.html.parse(response.content.decode('utf-8'))
+        langs = util.html.xpath(tree, "//select[@id='field-language']/option/@value")
         if self.language is None or self.language not in langs:
             raise ValueError(
                 'Invalid language: %s. For a list of installed languages check get_languages().' % self.language)
 
-        key = util.html.xpath(content, "//input[@name='WebSessionKey']/@value")[0]
+        key = util.html.xpath(tree, "//input[@name='WebSessionKey']/@value")[0]
 
         data = {
             'USERNAME': self.username,
@@ -99,17 +290,283 @@ class Session:
         if len(response.cookies) == 0:
             raise RuntimeError('Invalid username or password.')
         self.http_session = http_session
+        self.server_nodes = None
 
-        # TODO Implement logic to get information about the authenticated user.
-        self.auth_user = None
+    def __resume(self, entry):
+        """Resumes a stored session if the application server still accepts its cookies.
 
-        # TODO Implement logic to build a database connection using default Server properties.
-        self.db_con = None
+        Returns
+        -------
+        bool
+            True if the session was resumed.
 
-    def __del__(self):
-        """Destroys the current user session on application server.
+        """
+        if entry is None:
+            return False
+        http_session = self.transport.session()
+        http_session.auth = (self.username, self.password)
+        http_session.cookies.update(entry['cookies'])
+        http_session.base_url = entry['base_url']
+        home_page = urlparse.urljoin(self.url, Server.SECURITY_HOME_PAGE)
+        response = http_session.get(home_page, verify=False, allow_redirects=False)
+        if response.status_code != requests.codes.ok or 'WebSessionKey' in response.content:
+            self.store.remove(self)
+            return False
+        self.http_session = http_session
+        self.server_nodes = entry['server_nodes']
+        return True
+
+    def reauthenticate(self):
+        """Logs onto the application server again, after the session expired.
+
+        The cookies of the new session replace those of the current `http_session` object, so objects holding a
+        reference to it keep working. The server configuration in `server_nodes` is kept.
 
         """
+        http_session = self.http_session
+        server_nodes = self.server_nodes
+        self.__logon()
+        self.server_nodes = server_nodes
+        http_session.cookies.clear()
+        http_session.cookies.update(self.http_session.cookies)
+        if isinstance(http_session, HTTPSession):
+            http_session.invalidate_base_url()
+        self.http_session = http_session
+        if self.store is not None:
+            self.store.save(self)
+
+    def logout(self):
+        """Destroys the current user session on application server and removes it from `store`.
+
+        """
+        if self.store is not None:
+            self.store.remove(self)
         if len(self.http_session.cookies) > 0:
             logout_page = urlparse.urljoin(self.url, Server.SECURITY_LOGOUT_PAGE)
             self.http_session.get(logout_page, verify=False)
+            self.http_session.cookies.clear()
+
+    def __del__(self):
+        """Destroys the current user session on application server, unless `auto_logout` is False.
+
+        """
+        if getattr(self, 'auto_logout', False) and hasattr(self, 'http_session'):
+            self.logout()
+
+
+class SessionPool(object):
+    """Pool of authenticated sessions of several users.
+
+    Sessions are keyed by (url, username, language, password), so an idle session is only handed to callers giving
+    the password it was logged on with. Idle sessions are reused, and at most `max_per_user` sessions are open for
+    each key; `acquire` waits for a session to be released when the limit is reached. Pooled sessions log on again
+    transparently when the application server rejects them (HTTP 401 or a redirect to the logon page) and resend the
+    rejected request. Sessions are logged out only when evicted or when the pool is closed.
+
+    Parameters
+    ----------
+    max_per_user : int, optional
+        Maximum number of open sessions per (url, username, language, password). Default is 4.
+    max_idle_time : float, optional
+        Seconds an idle session is kept before being evicted. Default is None (idle sessions are kept).
+    transport : :obj:`Transport`, optional
+        HTTP transport settings of the sessions. Default is a `Transport` with default settings.
+
+    Attributes
+    ----------
+    max_per_user : int
+        Maximum number of open sessions per (url, username, language, password).
+    max_idle_time : float
+        Seconds an idle session is kept before being evicted.
+    transport : :obj:`Transport`
+        HTTP transport settings of the sessions.
+
+    """
+
+    def __init__(self, max_per_user=4, max_idle_time=None, transport=None):
+        self.max_per_user = max_per_user
+        self.max_idle_time = max_idle_time
+        self.transport = transport
+        self._idle = dict()
+        self._size = dict()
+        self._closed = False
+        self._lock = threading.Condition()
+
+    def acquire(self, url, username, password, language, timeout=None):
+        """Checks out a session of the given user.
+
+        Parameters
+        ----------
+        url : str
+            Application server URL.
+        username : str
+            Username to log in.
+        password : str
+            Password to log in.
+        language : str
+            Language used by the user.
+        timeout : float, optional
+            Seconds to wait for a session when the user already has `max_per_user` sessions checked out. Default is
+            None (wait indefinitely).
+
+        Returns
+        -------
+        :obj:`Session`
+            An authenticated session.
+
+        Raises
+        ------
+        RuntimeError
+            If the pool is closed or no session is released before `timeout`.
+
+        """
+        key = (url, username, language, password)
+        deadline = None if timeout is None else time.time() + timeout
+        expired = []
+        session = None
+        try:
+            with self._lock:
+                while True:
+                    if self._closed:
+                        raise RuntimeError('Session pool is closed.')
+                    expired += self.__expire(key)
+                    if len(self._idle.get(key, [])) > 0:
+                        session = self._idle[key].pop()[0]
+                        return session
+                    if self._size.get(key, 0) < self.max_per_user:
+                        self._size[key] = self._size.get(key, 0) + 1
+                        break
+                    remaining = None if deadline is None else deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        raise RuntimeError('Timed out waiting for a session of user %s.' % username)
+                    self._lock.wait(remaining)
+        finally:
+            self.__logout(expired)
+
+        try:
+            session = Session(url, username, password, language, transport=self.transport)
+        except Exception:
+            with self._lock:
+                self._size[key] -= 1
+                self._lock.notify_all()
+            raise
+        session.auto_logout = False
+        session.http_session.hooks['response'].append(_reauthentication_hook(session))
+        return session
+
+    def release(self, session):
+        """Returns a session to the pool.
+
+        Parameters
+        ----------
+        session : :obj:`Session`
+            Session checked out by `acquire`.
+
+        """
+        key = (session.url, session.username, session.language, session.password)
+        with self._lock:
+            if not self._closed:
+                self._idle.setdefault(key, []).append((session, time.time()))
+                self._lock.notify_all()
+                return
+            self._size[key] -= 1
+        self.__logout([session])
+
+    @contextlib.contextmanager
+    def session(self, url, username, password, language, timeout=None):
+        """Checks out a session for the duration of a `with` block.
+
+        See `acquire` for a description of the parameters.
+
+        Yields
+        ------
+        :obj:`Session`
+            An authenticated session.
+
+        """
+        session = self.acquire(url, username, password, language, timeout)
+        try:
+            yield session
+        finally:
+            self.release(session)
+
+    def evict(self, url=None, username=None, language=None):
+        """Logs out idle sessions.
+
+        Parameters
+        ----------
+        url : str, optional
+            Application server URL. Default is None (all URLs).
+        username : str, optional
+            Username. Default is None (all users).
+        language : str, optional
+            Language. Default is None (all languages).
+
+        """
+        evicted = []
+        with self._lock:
+            for key in self._idle.keys():
+                if (url is None or key[0] == url) and (username is None or key[1] == username) \
+                        and (language is None or key[2] == language):
+                    sessions = [session for session, released in self._idle.pop(key)]
+                    self._size[key] -= len(sessions)
+                    evicted += sessions
+            self._lock.notify_all()
+        self.__logout(evicted)
+
+    def close(self):
+        """Logs out all idle sessions. Sessions checked out are logged out when released.
+
+        """
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        self.evict()
+
+    def __expire(self, key):
+        """Removes idle sessions older than `max_idle_time` from the pool. Must be called with the lock held.
+
+        """
+        if self.max_idle_time is None or key not in self._idle:
+            return []
+        limit = time.time() - self.max_idle_time
+        expired = [session for session, released in self._idle[key] if released < limit]
+        self._idle[key] = [entry for entry in self._idle[key] if entry[1] >= limit]
+        self._size[key] -= len(expired)
+        return expired
+
+    @staticmethod
+    def __logout(sessions):
+        for session in sessions:
+            try:
+                session.logout()
+            except requests.RequestException:
+                pass
+
+
+def _reauthentication_hook(session):
+    """Returns a response hook that logs on again and resends requests rejected because the session expired.
+
+    The hook holds a weak reference to the session, so it does not keep the session alive.
+
+    """
+    session = weakref.ref(session)
+
+    def hook(response, **kwargs):
+        current = session()
+        if current is None or getattr(response.request, 'reauthenticated', False):
+            return response
+        location = response.headers.get('Location', '')
+        expired = response.status_code == requests.codes.unauthorized \
+            or (response.is_redirect and Server.SECURITY_LOGON_PAGE in location)
+        if not expired or Server.SECURITY_LOGON_PAGE in response.request.url:
+            return response
+
+        current.reauthenticate()
+        request = response.request.copy()
+        request.headers.pop('Cookie', None)
+        request.prepare_cookies(current.http_session.cookies)
+        request.reauthenticated = True
+        return current.http_session.send(request, **kwargs)
+
+    return hook
@@ -21,6 +21,8 @@ Attributes
 ----------
 ISO_DATE_FORMAT : str
     ISO 8601 date format
+NAMESPACES : dict of str : str
+    Namespace URIs by prefix used in SOAP web services messages.
 
 """
 
@@ -31,7 +33,18 @@ import httplib
 import requests
 import urlparse
 
+from xml.sax.saxutils import escape, quoteattr
+
+from pyppmc.transport import get_base_url
+
 ISO_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
+NAMESPACES = {
+    'soapenv': 'http://schemas.xmlsoap.org/soap/envelope/',
+    'pre': 'http://mercury.com/ppm/dm/1.0',
+    'common': 'http://mercury.com/ppm/common/1.0',
+    'service': 'http://mercury.com/ppm/dm/service/1.0',
+    'xsi': 'http://www.w3.org/2001/XMLSchema-instance'
+}
 
 
 def iso_to_datetime(value):
@@ -69,7 +82,94 @@ def datetime_to_iso(value):
     return datetime.datetime.strftime(value, ISO_DATE_FORMAT) + '.000' + tz
 
 
-def call_operation(http_session, path, data=None, params=None):
+class Envelope(object):
+    """Builder of SOAP request envelopes.
+
+    Parts of the message are appended to a list and joined once when the envelope is serialized, so building an
+    envelope takes linear time in the number of elements. Values are XML-escaped and encoded in UTF-8.
+
+    Parameters
+    ----------
+    operation : str
+        Qualified name of the operation element, e.g. 'ns:getRequests'.
+    namespaces : dict of str : str, optional
+        Namespace URIs by prefix used in the body of the envelope.
+
+    Examples
+    --------
+    >>> envelope = Envelope('ns:deleteRequests', {'ns': NAMESPACES['service'], 'ns1': NAMESPACES['pre']})
+    >>> envelope.start('ns:requestIds')
+    >>> envelope.element('ns1:id', 30000)
+    >>> envelope.end('ns:requestIds')
+    >>> data = envelope.to_string()
+
+    """
+
+    def __init__(self, operation, namespaces=None):
+        self.operation = operation
+        self._parts = ['<soapenv:Envelope xmlns:soapenv="%s"' % NAMESPACES['soapenv']]
+        for prefix, uri in sorted((namespaces or dict()).items()):
+            self._parts += [' xmlns:%s=%s' % (prefix, quoteattr(uri))]
+        self._parts += ['><soapenv:Header/><soapenv:Body><%s>' % operation]
+
+    def start(self, tag):
+        """Opens an element.
+
+        Parameters
+        ----------
+        tag : str
+            Qualified name of the element.
+
+        """
+        self._parts += ['<%s>' % tag]
+
+    def end(self, tag):
+        """Closes an element opened by `start`.
+
+        Parameters
+        ----------
+        tag : str
+            Qualified name of the element.
+
+        """
+        self._parts += ['</%s>' % tag]
+
+    def element(self, tag, value):
+        """Adds an element containing a value.
+
+        Parameters
+        ----------
+        tag : str
+            Qualified name of the element.
+        value : :obj:`object`
+            Value of the element. Datetime objects are converted to ISO 8601 strings, other objects to str.
+
+        """
+        self._parts += ['<%s>' % tag, _to_xml_text(value), '</%s>' % tag]
+
+    def to_string(self):
+        """Serializes the envelope.
+
+        Returns
+        -------
+        str
+            UTF-8 encoded envelope.
+
+        """
+        return ''.join(self._parts + ['</%s></soapenv:Body></soapenv:Envelope>' % self.operation])
+
+
+def _to_xml_text(value):
+    if isinstance(value, datetime.datetime):
+        value = datetime_to_iso(value)
+    elif isinstance(value, unicode):
+        value = value.encode('utf-8')
+    elif not isinstance(value, str):
+        value = str(value)
+    return escape(value)
+
+
+def call_operation(http_session, path, data=None, params=None, stream=False):
     """Calls a SOAP service operation.
 
     Parameters
@@ -82,6 +182,9 @@ def call_operation(http_session, path, data=None, params=None):
         Data to be consumed by the operation.
     params : dict of str : str, optional
         Query parameters to passed to the operation.
+    stream : bool, optional
+        Flag to indicate if the response body must be downloaded as it is read (through `Response.raw` or
+        `Response.iter_content`) instead of immediately. Default is False.
 
     Returns
     -------
@@ -96,23 +199,13 @@ def call_operation(http_session, path, data=None, params=None):
         If HTTP response status code is not equal to 200.
 
     """
-    base_url = ''
-    for cookie in http_session.cookies:
-        if cookie.name == 'JSESSIONID' and cookie.path == '/itg/':
-            if cookie.secure:
-                protocol = 'https'
-                port = 443 if cookie.port is None else cookie.port
-            else:
-                protocol = 'http'
-                port = 80 if cookie.port is None else cookie.port
-            domain = cookie.domain
-            base_url = '%s://%s:%d/' % (protocol, domain, port)
-            break
+    base_url = getattr(http_session, 'base_url', None) or get_base_url(http_session.cookies) or ''
 
     url = urlparse.urljoin(base_url, path)
     headers = {'Content-Type': 'text/xml; charset=utf-8'}
-    response = http_session.post(url, data=data, verify=False, headers=headers, params=params)
+    response = http_session.post(url, data=data, verify=False, headers=headers, params=params, stream=stream)
     if response.status_code == requests.codes.ok:
         return response
     else:
+        response.close()
         raise requests.HTTPError('%d %s' % (response.status_code, httplib.responses[response.status_code]))
@@ -21,81 +21,145 @@ Attributes
 ----------
 SERVICE_ENDPOINT : str
     Service endpoint path.
+GET_REQUESTS_CHUNK_SIZE : int
+    Default number of requests retrieved per getRequests call.
 
 """
 
 import datetime
-import lxml
+import lxml.etree
 import soap
 
 from request import Request
+from util import batch
+from util.xpath import compile_xpath
 
 SERVICE_ENDPOINT = '/itg/ppmservices/DemandService'
-
-
-def get_requests(http_session, request_ids):
+GET_REQUESTS_CHUNK_SIZE = 200
+
+_ENVELOPE_NAMESPACES = {
+    'ns': soap.NAMESPACES['service'],
+    'ns1': soap.NAMESPACES['pre'],
+    'ns2': soap.NAMESPACES['common']
+}
+_RETURN_TAG = '{%s}return' % soap.NAMESPACES['service']
+_RETURN_TEXT = compile_xpath('//service:return/text()', soap.NAMESPACES)
+_RETURN_ID = compile_xpath('//service:return/pre:identifier/pre:id/text()', soap.NAMESPACES)
+_REQUEST_TYPE = compile_xpath('./pre:requestType/text()', soap.NAMESPACES)
+_SIMPLE_FIELDS = compile_xpath('./pre:simpleFields', soap.NAMESPACES)
+_FIELD_NAME = compile_xpath('./common:name/text()', soap.NAMESPACES)
+_STRING_VALUE = compile_xpath('./pre:stringValue/text()', soap.NAMESPACES)
+_DATE_VALUE = compile_xpath('./pre:dateValue/text()', soap.NAMESPACES)
+
+
+def get_requests(http_session, request_ids, chunk_size=GET_REQUESTS_CHUNK_SIZE, concurrency=4, target_latency=10.0,
+                 max_chunk_size=2000):
     """Returns details of the given requests.
 
+    Requests are retrieved in chunks, so large lists of IDs do not produce a single huge envelope. Chunks are sent
+    with at most `concurrency` calls running at the same time, and the size of the next chunks is adjusted so that
+    each call takes about `target_latency` seconds.
+
     Parameters
     ----------
     http_session : :[obj]:`Session`
         HTTP session object.
     request_ids : list of int
         List of request ID to search.
+    chunk_size : int, optional
+        Number of requests of the first chunk. Default is `GET_REQUESTS_CHUNK_SIZE`.
+    concurrency : int, optional
+        Maximum number of chunks retrieved at the same time. Default is 4.
+    target_latency : float, optional
+        Desired response time of a chunk, in seconds. Default is 10.
+    max_chunk_size : int, optional
+        Maximum number of requests per chunk. Default is 2000.
 
     Returns
     -------
     list of :[obj]:`Request`
-        List of request objects containing their data.
+        List of request objects containing their data. Chunk results are merged in the order of `request_ids`.
 
     """
-    request_xml = """\
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" 
-           xmlns:ns="http://mercury.com/ppm/dm/service/1.0" xmlns:ns1="http://mercury.com/ppm/dm/1.0">
-           <soapenv:Header/>
-           <soapenv:Body>
-              <ns:getRequests>"""
+    request_ids = list(request_ids)
+    if len(request_ids) <= chunk_size:
+        return _get_requests(http_session, request_ids)
 
-    for id in request_ids:
-        request_xml += """
-                 <ns:requestIds>
-                    <ns1:id>%d</ns1:id>
-                 </ns:requestIds>""" % id
+    chunk_size = batch.AdaptiveBatchSize(chunk_size, 1, max(chunk_size, max_chunk_size), target_latency)
 
-    request_xml += """
-              </ns:getRequests>
-           </soapenv:Body>
-        </soapenv:Envelope>"""
+    def fetch(offset, size):
+        return _get_requests(http_session, request_ids[offset:offset + size])
 
-    response = soap.call_operation(http_session, SERVICE_ENDPOINT, data=request_xml)
-    ns = {
-        'soapenv': 'http://schemas.xmlsoap.org/soap/envelope/',
-        'pre': 'http://mercury.com/ppm/dm/1.0',
-        'common': 'http://mercury.com/ppm/common/1.0',
-        'service': 'http://mercury.com/ppm/dm/service/1.0',
-        'xsi': 'http://www.w3.org/2001/XMLSchema-instance'
-    }
     requests = []
-    tree = lxml.etree.fromstring(response.content)
-    for ret in tree.xpath('//service:return', namespaces=ns):
-        request = Request()
-        request_type = ret.xpath('./pre:requestType/text()', namespaces=ns)[0]
-        request.fields['REQ.REQUEST_TYPE_NAME'] = request_type
-        for simpleFields in ret.xpath('./pre:simpleFields', namespaces=ns):
-            token = simpleFields.xpath('./common:name/text()', namespaces=ns)[0]
-            node = simpleFields.xpath('./pre:stringValue/text()', namespaces=ns)
-            value = None
-            if len(node) > 0:
-                value = node[0]
-            else:
-                node = simpleFields.xpath('./pre:dateValue/text()', namespaces=ns)
-                if len(node) > 0:
-                    value = soap.iso_to_datetime(node[0])
-            request.fields[token] = value
-        requests += [request]
+    for offset, size, chunk_requests in batch.adaptive_dispatch(fetch, chunk_size, concurrency, len(request_ids)):
+        requests += chunk_requests
     return requests
 
 
+def iter_requests(http_session, request_ids, chunk_size=GET_REQUESTS_CHUNK_SIZE):
+    """Yields details of the given requests as they are received.
+
+    Responses are parsed while they are downloaded and each request is discarded from the parsed document once it is
+    yielded, so memory use does not grow with the number of requests. Chunks of `chunk_size` requests are retrieved
+    one after the other.
+
+    Parameters
+    ----------
+    http_session : :[obj]:`Session`
+        HTTP session object.
+    request_ids : list of int
+        List of request ID to search.
+    chunk_size : int, optional
+        Number of requests retrieved per call. Default is `GET_REQUESTS_CHUNK_SIZE`.
+
+    Yields
+    ------
+    :[obj]:`Request`
+        Request object containing its data.
+
+    """
+    for chunk in batch.chunks(request_ids, chunk_size):
+        for request in _iter_requests(http_session, chunk):
+            yield request
+
+
+def _get_requests(http_session, request_ids):
+    return list(_iter_requests(http_session, request_ids))
+
+
+def _iter_requests(http_session, request_ids):
+    request_xml = _request_ids_envelope('ns:getRequests', request_ids)
+    response = soap.call_operation(http_session, SERVICE_ENDPOINT, data=request_xml, stream=True)
+    try:
+        response.raw.decode_content = True
+        for event, element in lxml.etree.iterparse(response.raw, tag=_RETURN_TAG):
+            yield _parse_request(element)
+            # Drop the parsed request and the references the document keeps to previous siblings.
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+    finally:
+        response.close()
+
+
+def _parse_request(element):
+    request = Request()
+    request_type = _REQUEST_TYPE(element)[0]
+    request.fields['REQ.REQUEST_TYPE_NAME'] = request_type
+    for simpleFields in _SIMPLE_FIELDS(element):
+        token = _FIELD_NAME(simpleFields)[0]
+        node = _STRING_VALUE(simpleFields)
+        value = None
+        if len(node) > 0:
+            value = node[0]
+        else:
+            node = _DATE_VALUE(simpleFields)
+            if len(node) > 0:
+                value = soap.iso_to_datetime(node[0])
+        request.fields[token] = value
+    return request
+
+
 def create_request(http_session, request):
     """Creates a new request.
 
@@ -104,7 +168,7 @@ def create_request(http_session, request):
     http_session : :[obj]:`Session`
         HTTP session object.
     request : :[obj]:`Request`
-        Request object containing its data.
+        Request object containing its data. Fields whose value is None are not sent.
 
     Returns
     -------
@@ -112,54 +176,19 @@ def create_request(http_session, request):
         ID of the new request.
 
     """
-    request_type = request.tokens['REQ.REQUEST_TYPE_NAME'] if 'REQ.REQUEST_TYPE_NAME' in request.tokens else ''
-
-    request_xml = """\
-            <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
-               xmlns:ns="http://mercury.com/ppm/dm/service/1.0" xmlns:ns1="http://mercury.com/ppm/dm/1.0"
-               xmlns:ns2="http://mercury.com/ppm/common/1.0">
-               <soapenv:Header/>
-               <soapenv:Body>
-                  <ns:createRequest>
-                     <ns:requestObj>"""
-
-    if request_type != '':
-        request_xml += '<ns1:requestType>%s</ns1:requestType>' % request_type
-
+    envelope = soap.Envelope('ns:createRequest', _ENVELOPE_NAMESPACES)
+    envelope.start('ns:requestObj')
+    request_type = request.fields.get('REQ.REQUEST_TYPE_NAME')
+    if request_type:
+        envelope.element('ns1:requestType', request_type)
     # TODO Implement logic for tables, notes, fieldChangeNotes, URLReferences and remoteReferences.
-    simple_fields = ''
-    for token in request.tokens.keys():
-        value = request.tokens[token]
-        if isinstance(value, datetime.datetime):
-            simple_fields += """
-                        <ns1:simpleFields>
-                           <ns2:name>%s</ns2:name>
-                           <ns1:dateValue>%s</ns1:dateValue>
-                        </ns1:simpleFields>""" % (token, soap.datetime_to_iso(value))
-        else:
-            simple_fields += """
-                        <ns1:simpleFields>
-                           <ns2:name>%s</ns2:name>
-                           <ns1:stringValue>%s</ns1:stringValue>
-                        </ns1:simpleFields>""" % (token, value)
-
-    request_xml += simple_fields
-    request_xml += """
-                     </ns:requestObj>
-                  </ns:createRequest>
-               </soapenv:Body>
-            </soapenv:Envelope>"""
+    _add_fields(envelope, 'ns1:simpleFields', request.fields)
+    envelope.end('ns:requestObj')
+    request_xml = envelope.to_string()
 
     response = soap.call_operation(http_session, SERVICE_ENDPOINT, data=request_xml)
-    ns = {
-        'soapenv': 'http://schemas.xmlsoap.org/soap/envelope/',
-        'pre': 'http://mercury.com/ppm/dm/1.0',
-        'common': 'http://mercury.com/ppm/common/1.0',
-        'service': 'http://mercury.com/ppm/dm/service/1.0',
-        'xsi': 'http://www.w3.org/2001/XMLSchema-instance'
-    }
     tree = lxml.etree.fromstring(response.content)
-    request_id = tree.xpath('//service:return/pre:identifier/pre:id/text()', namespaces=ns)[0]
+    request_id = _RETURN_ID(tree)[0]
     return int(request_id)
 
 
@@ -172,8 +201,8 @@ def set_request_fields(http_session, request_id, tokens):
         HTTP session object.
     request_id : int
         Id of the request to update.
-    tokens : dict of str : str
-        Data to update.
+    tokens : dict of str : :[obj]:`Object`
+        Data to update. Datetime values are sent as dates. Fields whose value is None are not sent.
 
     Returns
     -------
@@ -181,45 +210,16 @@ def set_request_fields(http_session, request_id, tokens):
         ID of the updated request.
 
     """
-    request_xml = """\
-        <soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope" xmlns:ns="http://mercury.com/ppm/dm/service/1.0" xmlns:ns1="http://mercury.com/ppm/dm/1.0" xmlns:ns2="http://mercury.com/ppm/common/1.0">
-           <soap:Header/>
-           <soap:Body>
-              <ns:setRequestFields>
-                 <ns:requestId>
-                    <ns1:id>40092</ns1:id>
-                 </ns:requestId>""" % request_id
-
-    for token in tokens.keys():
-        value = tokens[token]
-        if isinstance(value, datetime.datetime):
-            request_xml += """
-                     <ns:fields>
-                        <ns2:name>%s</ns2:name>
-                        <ns1:dateValue>No</ns1:stringValue>
-                     </ns:fields>""" % (token, soap.datetime_to_iso(value))
-        else:
-            request_xml += """
-                     <ns:fields>
-                        <ns2:name>%s</ns2:name>
-                        <ns1:stringValue>%s</ns1:stringValue>
-                     </ns:fields>""" % (token, value)
-
-        request_xml += """
-              </ns:setRequestFields>
-           </soap:Body>
-        </soap:Envelope>"""
+    envelope = soap.Envelope('ns:setRequestFields', _ENVELOPE_NAMESPACES)
+    envelope.start('ns:requestId')
+    envelope.element('ns1:id', int(request_id))
+    envelope.end('ns:requestId')
+    _add_fields(envelope, 'ns:fields', tokens)
+    request_xml = envelope.to_string()
 
     response = soap.call_operation(http_session, SERVICE_ENDPOINT, data=request_xml)
-    ns = {
-        'soapenv': 'http://schemas.xmlsoap.org/soap/envelope/',
-        'pre': 'http://mercury.com/ppm/dm/1.0',
-        'common': 'http://mercury.com/ppm/common/1.0',
-        'service': 'http://mercury.com/ppm/dm/service/1.0',
-        'xsi': 'http://www.w3.org/2001/XMLSchema-instance'
-    }
     tree = lxml.etree.fromstring(response.content)
-    request_id = tree.xpath('//service:return/text()', namespaces=ns)[0]
+    request_id = _RETURN_TEXT(tree)[0]
     return int(request_id)
 
 
@@ -239,36 +239,56 @@ def delete_requests(http_session, request_ids):
         Number of requests deleted.
 
     """
-    request_xml = """\
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:ns="http://mercury.com/ppm/dm/service/1.0" xmlns:ns1="http://mercury.com/ppm/dm/1.0">
-           <soapenv:Header/>
-           <soapenv:Body>
-              <ns:deleteRequests>"""
-
-    for id in request_ids:
-        request_xml += """
-                 <ns:requestIds>
-                    <ns1:id>%d</ns1:id>
-                 </ns:requestIds>""" % id
-
-    request_xml += """
-              </ns:deleteRequests>
-           </soapenv:Body>
-        </soapenv:Envelope>"""
+    request_xml = _request_ids_envelope('ns:deleteRequests', request_ids)
 
     response = soap.call_operation(http_session, SERVICE_ENDPOINT, data=request_xml)
-    ns = {
-        'soapenv': 'http://schemas.xmlsoap.org/soap/envelope/',
-        'pre': 'http://mercury.com/ppm/dm/1.0',
-        'common': 'http://mercury.com/ppm/common/1.0',
-        'service': 'http://mercury.com/ppm/dm/service/1.0',
-        'xsi': 'http://www.w3.org/2001/XMLSchema-instance'
-    }
     tree = lxml.etree.fromstring(response.content)
-    count = tree.xpath('//service:return/text()', namespaces=ns)[0]
+    count = _RETURN_TEXT(tree)[0]
     return int(count)
 
 
+def _request_ids_envelope(operation, request_ids):
+    envelope = soap.Envelope(operation, _ENVELOPE_NAMESPACES)
+    for id in request_ids:
+        envelope.start('ns:requestIds')
+        envelope.element('ns1:id', int(id))
+        envelope.end('ns:requestIds')
+    return envelope.to_string()
+
+
+def _add_fields(envelope, tag, fields):
+    for token, value in fields.items():
+        if value is None:
+            continue
+        envelope.start(tag)
+        envelope.element('ns2:name', token)
+        envelope.element('ns1:dateValue' if isinstance(value, datetime.datetime) else 'ns1:stringValue', value)
+        envelope.end(tag)
+
+
+def save_requests(http_session, requests, concurrency=4, refresh=True):
+    """Creates or updates several requests.
+
+    Parameters
+    ----------
+    http_session : :[obj]:`Session`
+        HTTP session object.
+    requests : list of :[obj]:`Request`
+        Request data to persist. Saved objects are updated in place.
+    concurrency : int, optional
+        Maximum number of requests saved at the same time. Default is 4.
+    refresh : bool, optional
+        Flag to indicate if saved requests must be read back. Default is True.
+
+    Returns
+    -------
+    dict of int : str
+        Error messages by position in `requests`.
+
+    """
+    return RequestSoap(http_session).save_many(requests, concurrency, refresh)
+
+
 class RequestSoap:
     """Request persistence class based on PPM SOAP Web Services.
 
@@ -282,7 +302,7 @@ class RequestSoap:
     def __init__(self, http_session):
         self.http_session = http_session
 
-    def save(self, request):
+    def save(self, request, refresh=True):
         """Saves the request.
 
         If REQ.REQUEST_ID name is present on request object, then the given request is updated.
@@ -292,6 +312,9 @@ class RequestSoap:
         ----------
         request : :[obj]:`Request`
             Request object containing data to persist.
+        refresh : bool, optional
+            Flag to indicate if the request must be read back after saving. If False, only REQ.REQUEST_ID is set and
+            the request is read back only when its fields are accessed. Default is True.
 
         Returns
         -------
@@ -299,19 +322,62 @@ class RequestSoap:
             The new or updated request.
 
         """
-        request_id = request.tokens['REQ.REQUEST_ID'] if 'REQ.REQUEST_ID' in request.tokens else '0'
+        # TODO Implement logic to update other objects using available operations (addRequestNotes, setRequestRemoteReferenceStatus)
+        self.__set_saved(request, self.__process(request), refresh)
+        if refresh:
+            self._refresh(request)
+        return request
 
-        if int(request_id) > 0:
-            # TODO Implement logic to update other objects using available operations (addRequestNotes, setRequestRemoteReferenceStatus)
-            request_id = set_request_fields(self.http_session, int(request_id), request.tokens)
-        else:
-            request_id = create_request(self.http_session, request)
+    def save_many(self, requests, concurrency=4, refresh=True, chunk_size=GET_REQUESTS_CHUNK_SIZE):
+        """Creates or updates the given requests.
 
-        req = get_requests(self.http_session, [request_id])[0]
-        request.tokens = dict()
-        for token in req.tokens.keys():
-            request.tokens[token] = req.tokens[token]
-        return request
+        Requests with REQ.REQUEST_ID name are updated, the others are created. Up to `concurrency` createRequest or
+        setRequestFields calls run at the same time. A request that fails is reported without aborting the others.
+        Saved requests are read back together with chunked getRequests calls.
+
+        Parameters
+        ----------
+        requests : list of :[obj]:`Request`
+            Objects containing request data to persist. Saved objects are updated in place.
+        concurrency : int, optional
+            Maximum number of requests saved at the same time. Default is 4.
+        refresh : bool, optional
+            Flag to indicate if saved requests must be read back. If False, requests are read back only when their
+            fields are accessed. Default is True.
+        chunk_size : int, optional
+            Number of requests read back per getRequests call. Default is `GET_REQUESTS_CHUNK_SIZE`.
+
+        Returns
+        -------
+        dict of int : str
+            Error messages by position in `requests`. Empty if all requests were saved. Requests that were saved but
+            not returned by getRequests are reported too; their REQ.REQUEST_ID is set.
+
+        """
+        requests = list(requests)
+        errors = dict()
+        saved = []
+        results = batch.bulk_map(lambda i: self.__process(requests[i]), range(len(requests)), concurrency)
+        for result in results:
+            if result.ok:
+                self.__set_saved(requests[result.item], result.value, refresh)
+                saved += [result.item]
+            else:
+                errors[result.item] = str(result.error).strip()
+
+        if refresh and len(saved) > 0:
+            refreshed = dict()
+            for req in get_requests(self.http_session, [requests[i].id for i in saved], chunk_size, concurrency):
+                if req.id is not None:
+                    refreshed[int(req.id)] = req
+            for i in saved:
+                req = refreshed.get(int(requests[i].id))
+                if req is None:
+                    errors[i] = 'Request %s was saved but could not be read back.' % requests[i].id
+                    continue
+                req.persister = self
+                requests[i].__dict__ = req.__dict__.copy()
+        return errors
 
     def get(self, request_id):
         """Returns details of the given request.
@@ -345,11 +411,45 @@ class RequestSoap:
             Request object without name REQ.REQUEST_ID
 
         """
-        request_id = request.tokens['REQ.REQUEST_ID'] if 'REQ.REQUEST_ID' in request.tokens else '0'
-        if int(request_id) > 0:
-            count = delete_requests(self.http_session, [int(request_id)])
+        if request.id is not None and int(request.id) > 0:
+            count = delete_requests(self.http_session, [int(request.id)])
             if count == 0:
                 raise RuntimeError('Failed to delete request.')
             else:
-                del request.tokens['REQ.REQUEST_ID']
+                del request.fields['REQ.REQUEST_ID']
         return request
+
+    def _refresh(self, request):
+        """Reads request data back from the application server.
+
+        Parameters
+        ----------
+        request : :[obj]:`Request`
+            Object containing request data. Must have REQ.REQUEST_ID set.
+
+        """
+        req = self.get(int(request.id))
+        request.__dict__ = req.__dict__.copy()
+
+    def __process(self, request):
+        """Creates or updates a request.
+
+        Returns
+        -------
+        int
+            ID of the created or updated request.
+
+        """
+        if request.id is not None and int(request.id) > 0:
+            return set_request_fields(self.http_session, int(request.id), request.fields)
+        return create_request(self.http_session, request)
+
+    def __set_saved(self, request, request_id, refresh):
+        """Sets the ID of a saved request.
+
+        If the request is not refreshed now, it is refreshed the first time its fields are accessed.
+
+        """
+        request.id = request_id
+        if not refresh:
+            request._loader = self._refresh
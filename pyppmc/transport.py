@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+# Copyright 2018 Alexandre Freitas
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing HTTP transport settings.
+
+"""
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+"""HTTP methods retried by default."""
+
+
+def get_base_url(cookies):
+    """Returns the application server base URL of an authenticated session.
+
+    The base URL is built from the PPM session cookie (JSESSIONID with path /itg/).
+
+    Parameters
+    ----------
+    cookies : :obj:`requests.cookies.RequestsCookieJar`
+        Cookies of the session.
+
+    Returns
+    -------
+    str
+        Application server base URL (protocol://domain:port), or None if cookies do not contain a PPM session.
+
+    """
+    for cookie in cookies:
+        if cookie.name == 'JSESSIONID' and cookie.path == '/itg/':
+            if cookie.secure:
+                protocol = 'https'
+                port = 443 if cookie.port is None else cookie.port
+            else:
+                protocol = 'http'
+                port = 80 if cookie.port is None else cookie.port
+            return '%s://%s:%d' % (protocol, cookie.domain, port)
+    return None
+
+
+class HTTPSession(requests.Session):
+    """HTTP session that keeps the application server base URL.
+
+    The base URL is built from the cookie jar the first time it is needed and rebuilt only after a response sets
+    cookies or `invalidate_base_url` is called.
+
+    Attributes
+    ----------
+    base_url : str
+        Application server base URL, or None if not connected to PPM.
+
+    """
+
+    def __init__(self):
+        super(HTTPSession, self).__init__()
+        self._base_url = None
+        self.hooks['response'].append(self.__on_response)
+
+    @property
+    def base_url(self):
+        if self._base_url is None:
+            self._base_url = get_base_url(self.cookies)
+        return self._base_url
+
+    @base_url.setter
+    def base_url(self, value):
+        self._base_url = value
+
+    def invalidate_base_url(self):
+        """Rebuilds the base URL from the cookie jar the next time it is needed.
+
+        Must be called after the cookie jar is changed directly.
+
+        """
+        self._base_url = None
+
+    def __on_response(self, response, **kwargs):
+        if len(response.cookies) > 0:
+            self._base_url = None
+        return response
+
+
+class Transport(object):
+    """HTTP transport settings of a user session.
+
+    The settings are applied to a `requests.Session` by mounting an HTTP adapter with the given connection pool and
+    retry policy, so every call made through the session (REST and SOAP operations, file downloads, SQL Runner
+    exports) shares them.
+
+    Parameters
+    ----------
+    pool_connections : int, optional
+        Number of hosts whose connection pools are kept. Default is 10.
+    pool_maxsize : int, optional
+        Maximum number of connections kept open per host. Should be at least the number of threads sharing the
+        session. Default is 10.
+    pool_block : bool, optional
+        Flag to indicate if requests must wait for a free connection when `pool_maxsize` connections are in use,
+        instead of opening extra connections that are discarded afterwards. Default is False.
+    retries : int, optional
+        Maximum number of retries of a request that failed to connect, failed to read or returned one of the
+        `retry_status` codes. Default is 3.
+    backoff_factor : float, optional
+        Retries wait `backoff_factor` * 2 ^ (retry number - 1) seconds. Default is 0.5.
+    retry_status : list of int, optional
+        HTTP status codes that trigger a retry. Default is [502, 503, 504].
+    retry_methods : list of str, optional
+        HTTP methods that are retried. Default is `IDEMPOTENT_METHODS`.
+    compress : bool, optional
+        Flag to indicate if gzip/deflate compressed responses are accepted. Default is True.
+    keep_alive : bool, optional
+        Flag to indicate if connections are kept open between requests. Default is True.
+
+    Attributes
+    ----------
+    pool_connections : int
+        Number of hosts whose connection pools are kept.
+    pool_maxsize : int
+        Maximum number of connections kept open per host.
+    pool_block : bool
+        Flag to indicate if requests must wait for a free connection.
+    retries : int
+        Maximum number of retries of a request.
+    backoff_factor : float
+        Backoff factor between retries.
+    retry_status : list of int
+        HTTP status codes that trigger a retry.
+    retry_methods : list of str
+        HTTP methods that are retried.
+    compress : bool
+        Flag to indicate if compressed responses are accepted.
+    keep_alive : bool
+        Flag to indicate if connections are kept open between requests.
+
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False, retries=3, backoff_factor=0.5,
+                 retry_status=None, retry_methods=None, compress=True, keep_alive=True):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.retry_status = retry_status if retry_status is not None else [502, 503, 504]
+        self.retry_methods = retry_methods if retry_methods is not None else IDEMPOTENT_METHODS
+        self.compress = compress
+        self.keep_alive = keep_alive
+
+    def mount(self, http_session):
+        """Applies the transport settings to an HTTP session.
+
+        Parameters
+        ----------
+        http_session : :obj:`requests.Session`
+            HTTP session object.
+
+        Returns
+        -------
+        :obj:`requests.Session`
+            The given HTTP session.
+
+        """
+        retry = Retry(total=self.retries, backoff_factor=self.backoff_factor, status_forcelist=self.retry_status,
+                      method_whitelist=frozenset(self.retry_methods), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block, max_retries=retry)
+        http_session.mount('http://', adapter)
+        http_session.mount('https://', adapter)
+        http_session.headers['Accept-Encoding'] = 'gzip, deflate' if self.compress else 'identity'
+        http_session.headers['Connection'] = 'keep-alive' if self.keep_alive else 'close'
+        return http_session
+
+    def session(self):
+        """Returns a new HTTP session with the transport settings applied.
+
+        Returns
+        -------
+        :obj:`HTTPSession`
+            HTTP session object.
+
+        """
+        return self.mount(HTTPSession())
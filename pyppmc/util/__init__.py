@@ -17,6 +17,10 @@
 
 """
 
-__all__ = ['html']
+__all__ = ['batch', 'cache', 'columnar', 'html', 'xpath']
 
-import html
\ No newline at end of file
+import batch
+import cache
+import columnar
+import html
+import xpath
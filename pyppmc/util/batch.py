@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+# Copyright 2018 Alexandre Freitas
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing batch processing methods.
+
+"""
+
+import collections
+import time
+
+from multiprocessing.pool import ThreadPool
+
+
+def chunks(items, size):
+    """Splits a sequence into chunks.
+
+    Parameters
+    ----------
+    items : list of :obj:`object`
+        Sequence to split.
+    size : int
+        Maximum number of items per chunk.
+
+    Returns
+    -------
+    list of list of :obj:`object`
+        Consecutive chunks of `items`. Only the last chunk may be smaller than `size`.
+
+    Raises
+    ------
+    ValueError
+        If `size` is less than 1.
+
+    """
+    if size < 1:
+        raise ValueError('Invalid chunk size: %d.' % size)
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def unique(items):
+    """Removes duplicates from a sequence, keeping the order of first occurrences.
+
+    Parameters
+    ----------
+    items : list of :obj:`object`
+        Sequence of hashable items.
+
+    Returns
+    -------
+    list of :obj:`object`
+        Items without duplicates.
+
+    """
+    seen = set()
+    result = []
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            result += [item]
+    return result
+
+
+class AdaptiveBatchSize(object):
+    """Batch size that adapts to the observed processing time of each batch.
+
+    After each batch, the size is scaled so that the next batch takes about `target` seconds. Each update changes the
+    size by a factor of at most 2.
+
+    Parameters
+    ----------
+    size : int
+        Initial batch size.
+    minimum : int, optional
+        Minimum batch size. Default is 1.
+    maximum : int, optional
+        Maximum batch size. Default is None (no maximum).
+    target : float, optional
+        Desired processing time of a batch, in seconds. Default is 5.
+
+    Attributes
+    ----------
+    size : int
+        Current batch size.
+    minimum : int
+        Minimum batch size.
+    maximum : int
+        Maximum batch size.
+    target : float
+        Desired processing time of a batch, in seconds.
+
+    """
+
+    def __init__(self, size, minimum=1, maximum=None, target=5.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target = target
+        self.size = self.__clamp(size)
+
+    def update(self, size, elapsed):
+        """Adjusts the batch size after a batch is processed.
+
+        Parameters
+        ----------
+        size : int
+            Size of the processed batch.
+        elapsed : float
+            Seconds taken to process the batch.
+
+        Returns
+        -------
+        int
+            New batch size.
+
+        """
+        if elapsed <= 0:
+            factor = 2.0
+        else:
+            factor = min(max(self.target / elapsed, 0.5), 2.0)
+        self.size = self.__clamp(int(size * factor))
+        return self.size
+
+    def __clamp(self, size):
+        size = max(size, self.minimum, 1)
+        if self.maximum is not None:
+            size = min(size, self.maximum)
+        return size
+
+
+def adaptive_dispatch(func, batch_size, concurrency=1, total=None):
+    """Processes consecutive batches on a pool of threads, adapting their size to the observed processing time.
+
+    Up to `concurrency` batches are processed at the same time. Batches are yielded in order, and the size of the
+    batches dispatched next is updated with the processing time of each batch as it is yielded. Batches not yet
+    yielded are cancelled when the generator is closed, so callers may stop early (e.g. when a page comes back short).
+
+    Parameters
+    ----------
+    func : callable
+        Function called with the offset and size of each batch, e.g. ``func(0, 100)``.
+    batch_size : :obj:`AdaptiveBatchSize`
+        Size of the batches. Updated as batches are processed.
+    concurrency : int, optional
+        Maximum number of batches processed at the same time. Default is 1.
+    total : int, optional
+        Number of items to process. Default is None (batches are dispatched until the caller stops).
+
+    Yields
+    ------
+    tuple of (int, int, :obj:`object`)
+        Offset, size and value returned by `func` for each batch.
+
+    """
+    def process(offset, size):
+        start = time.time()
+        value = func(offset, size)
+        return value, time.time() - start
+
+    concurrency = max(concurrency, 1)
+    pool = ThreadPool(concurrency)
+    try:
+        pending = collections.deque()
+        offset = 0
+        while total is None or offset < total or len(pending) > 0:
+            while (total is None or offset < total) and len(pending) < concurrency:
+                size = batch_size.size if total is None else min(batch_size.size, total - offset)
+                pending.append((offset, size, pool.apply_async(process, (offset, size))))
+                offset += size
+
+            first, size, result = pending.popleft()
+            value, elapsed = result.get()
+            batch_size.update(size, elapsed)
+            yield first, size, value
+    finally:
+        pool.terminate()
+
+
+class BatchResult(object):
+    """Result of one item of a bulk operation.
+
+    Parameters
+    ----------
+    item : :obj:`object`
+        Item processed.
+    value : :obj:`object`, optional
+        Value returned by the operation.
+    error : :obj:`Exception`, optional
+        Exception raised by the operation.
+
+    Attributes
+    ----------
+    item : :obj:`object`
+        Item processed.
+    value : :obj:`object`
+        Value returned by the operation, or None if it failed.
+    error : :obj:`Exception`
+        Exception raised by the operation, or None if it succeeded.
+
+    """
+
+    def __init__(self, item, value=None, error=None):
+        self.item = item
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self):
+        """bool: True if the operation succeeded.
+
+        """
+        return self.error is None
+
+    def get(self):
+        """Returns the value of the operation, raising its exception if it failed.
+
+        Returns
+        -------
+        :obj:`object`
+            Value returned by the operation.
+
+        """
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def bulk_map(func, items, workers=8, ordered=True, timeout=None, pool=None):
+    """Applies a function to each item on a pool of threads.
+
+    Exceptions raised for an item are captured in its result instead of interrupting the other items. This is the
+    fan-out used by all bulk helpers and by `rest.client.AsyncClient.map`.
+
+    Parameters
+    ----------
+    func : callable
+        Function called with each item.
+    items : list of :obj:`object`
+        Items to process.
+    workers : int, optional
+        Maximum number of items processed at the same time. Ignored if `pool` is given. Default is 8.
+    ordered : bool, optional
+        Flag to indicate if results are yielded in the order of `items`. If False, results are yielded as they
+        complete. Default is True.
+    timeout : float, optional
+        Seconds to wait for each result. Default is None (wait indefinitely).
+    pool : :obj:`multiprocessing.pool.ThreadPool`, optional
+        Pool running the items. It is left open. Default is None (a pool of `workers` threads is created and
+        terminated when the results are consumed or the generator is closed).
+
+    Yields
+    ------
+    :obj:`BatchResult`
+        Result of each item.
+
+    Raises
+    ------
+    multiprocessing.TimeoutError
+        If a result is not available after `timeout` seconds.
+
+    """
+    def process(item):
+        try:
+            return BatchResult(item, func(item))
+        except Exception as e:
+            return BatchResult(item, error=e)
+
+    own_pool = pool is None
+    if own_pool:
+        pool = ThreadPool(max(workers, 1))
+    try:
+        results = pool.imap(process, items) if ordered else pool.imap_unordered(process, items)
+        while True:
+            try:
+                result = results.next(timeout)
+            except StopIteration:
+                break
+            yield result
+    finally:
+        if own_pool:
+            pool.terminate()
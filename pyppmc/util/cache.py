@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+# Copyright 2018 Alexandre Freitas
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing caching methods.
+
+"""
+
+import collections
+import cPickle
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+
+class LRUCache(object):
+    """Thread-safe cache with least recently used eviction and time to live.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        Maximum number of entries. Least recently used entries are evicted when the cache is full. A value of 0
+        disables the cache. Default is 1024.
+    ttl : float, optional
+        Seconds an entry is kept. Default is None (entries never expire).
+
+    Attributes
+    ----------
+    max_size : int
+        Maximum number of entries.
+    ttl : float
+        Seconds an entry is kept.
+    hits : int
+        Number of lookups that found a valid entry.
+    misses : int
+        Number of lookups that found no entry or an expired one.
+
+    """
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and (entry[1] is None or entry[1] > time.time())
+
+    def get(self, key, default=None):
+        """Returns the value cached for the given key.
+
+        Parameters
+        ----------
+        key : :obj:`object`
+            Hashable key of the entry.
+        default : :obj:`object`, optional
+            Value returned if the key is not cached or has expired.
+
+        Returns
+        -------
+        :obj:`object`
+            Cached value or `default`.
+
+        """
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+                self.misses += 1
+                return default
+            self._data[key] = entry
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        """Caches a value for the given key.
+
+        Parameters
+        ----------
+        key : :obj:`object`
+            Hashable key of the entry.
+        value : :obj:`object`
+            Value to cache.
+        ttl : float, optional
+            Seconds the entry is kept. Default is the cache `ttl`.
+
+        """
+        if self.max_size <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, expires)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """Removes the entry for the given key, if any.
+
+        Parameters
+        ----------
+        key : :obj:`object`
+            Hashable key of the entry.
+
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def keys(self):
+        """Returns the keys currently cached, from least to most recently used.
+
+        Returns
+        -------
+        list of :obj:`object`
+            Cached keys, including the expired ones not yet evicted.
+
+        """
+        with self._lock:
+            return list(self._data.keys())
+
+    def clear(self):
+        """Removes all entries and resets hit and miss counters.
+
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class FileCache(object):
+    """Thread-safe cache stored on disk, with least recently used eviction and time to live.
+
+    Each entry is pickled to its own file in `path`, so entries survive process restarts and may be shared by several
+    processes. `FileCache` has the same interface as `LRUCache`. Entries are loaded with pickle, so `path` must not be
+    writable by untrusted users. Subclasses may store entries in another format by overriding `_dump` and `_load`.
+
+    Parameters
+    ----------
+    path : str
+        Directory where entries are stored. Created if it does not exist.
+    max_size : int, optional
+        Maximum number of entries. Least recently used entries are evicted when the cache is full. A value of 0
+        disables the cache. Default is 1024.
+    ttl : float, optional
+        Seconds an entry is kept. Default is None (entries never expire).
+
+    Attributes
+    ----------
+    path : str
+        Directory where entries are stored.
+    max_size : int
+        Maximum number of entries.
+    ttl : float
+        Seconds an entry is kept.
+    hits : int
+        Number of lookups that found a valid entry.
+    misses : int
+        Number of lookups that found no entry or an expired one.
+
+    """
+
+    SUFFIX = '.cache'
+    """Suffix of entry files."""
+
+    def __init__(self, path, max_size=1024, ttl=None):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def __len__(self):
+        return len(self.__files())
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self.__load(self.__file(key))
+            return entry is not None and entry[0] == key and (entry[2] is None or entry[2] > time.time())
+
+    def get(self, key, default=None):
+        """Returns the value cached for the given key.
+
+        Parameters
+        ----------
+        key : :obj:`object`
+            Picklable key of the entry.
+        default : :obj:`object`, optional
+            Value returned if the key is not cached or has expired.
+
+        Returns
+        -------
+        :obj:`object`
+            Cached value or `default`.
+
+        """
+        with self._lock:
+            filename = self.__file(key)
+            entry = self.__load(filename)
+            if entry is None or entry[0] != key or (entry[2] is not None and entry[2] <= time.time()):
+                self.misses += 1
+                return default
+            try:
+                os.utime(filename, None)
+            except OSError:
+                pass
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """Caches a value for the given key.
+
+        Parameters
+        ----------
+        key : :obj:`object`
+            Picklable key of the entry.
+        value : :obj:`object`
+            Picklable value to cache.
+        ttl : float, optional
+            Seconds the entry is kept. Default is the cache `ttl`.
+
+        """
+        if self.max_size <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else time.time() + ttl
+        with self._lock:
+            filename = self.__file(key)
+            fd, tmp = tempfile.mkstemp(dir=self.path)
+            with os.fdopen(fd, 'wb') as f:
+                self._dump((key, value, expires), f)
+            if os.name == 'nt' and os.path.exists(filename):
+                os.remove(filename)
+            os.rename(tmp, filename)
+
+            files = self.__files()
+            for filename in files[:max(len(files) - self.max_size, 0)]:
+                self.__remove(filename)
+
+    def invalidate(self, key):
+        """Removes the entry for the given key, if any.
+
+        Parameters
+        ----------
+        key : :obj:`object`
+            Picklable key of the entry.
+
+        """
+        with self._lock:
+            self.__remove(self.__file(key))
+
+    def keys(self):
+        """Returns the keys currently cached, from least to most recently used.
+
+        Returns
+        -------
+        list of :obj:`object`
+            Cached keys, including the expired ones not yet evicted.
+
+        """
+        with self._lock:
+            entries = [self.__load(filename) for filename in self.__files()]
+            return [entry[0] for entry in entries if entry is not None]
+
+    def clear(self):
+        """Removes all entries and resets hit and miss counters.
+
+        """
+        with self._lock:
+            for filename in self.__files():
+                self.__remove(filename)
+            self.hits = 0
+            self.misses = 0
+
+    def _dump(self, entry, f):
+        """Writes an entry to a file.
+
+        Parameters
+        ----------
+        entry : tuple of (:obj:`object`, :obj:`object`, float)
+            Key, value and expiration time of the entry.
+        f : file
+            File open for writing in binary mode.
+
+        """
+        cPickle.dump(entry, f, cPickle.HIGHEST_PROTOCOL)
+
+    def _load(self, f):
+        """Reads an entry written by `_dump`.
+
+        Parameters
+        ----------
+        f : file
+            File open for reading in binary mode.
+
+        Returns
+        -------
+        tuple of (:obj:`object`, :obj:`object`, float)
+            Key, value and expiration time of the entry.
+
+        """
+        return cPickle.load(f)
+
+    def __file(self, key):
+        digest = hashlib.sha1(cPickle.dumps(key, cPickle.HIGHEST_PROTOCOL)).hexdigest()
+        return os.path.join(self.path, digest + self.SUFFIX)
+
+    def __files(self):
+        """Returns entry files from least to most recently used.
+
+        """
+        files = []
+        for filename in glob.glob(os.path.join(self.path, '*' + self.SUFFIX)):
+            try:
+                files += [(os.path.getmtime(filename), filename)]
+            except OSError:
+                pass
+        return [filename for mtime, filename in sorted(files)]
+
+    def __load(self, filename):
+        try:
+            with open(filename, 'rb') as f:
+                return self._load(f)
+        except (IOError, EOFError, ValueError, cPickle.UnpicklingError):
+            return None
+
+    @staticmethod
+    def __remove(filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
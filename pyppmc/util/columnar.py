@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+# Copyright 2018 Alexandre Freitas
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing columnar storage of tabular data.
+
+Numeric columns are stored in `array.array` objects, which hold raw machine values instead of Python objects. NumPy is
+optional; when it is installed, numeric columns can be viewed as NumPy arrays without copying.
+
+"""
+
+import array
+import re
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+INT_PATTERN = re.compile(r'^-?(0|[1-9][0-9]*)$')
+FLOAT_PATTERN = re.compile(r'^-?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?$')
+NAN = float('nan')
+
+
+class Column(object):
+    """Column of values whose type is inferred as values are appended.
+
+    A column starts as an array of integers. It is promoted to an array of floats when a value is not an integer
+    (empty values are stored as NaN), and to a list of str when a value is not a number. Values whose text cannot be
+    rebuilt from the stored number (e.g. '0012', '1.10', '1e400' or integers too large for a float) keep their
+    original text aside, so a promotion to str returns exactly the text that was appended.
+
+    Attributes
+    ----------
+    values : :obj:`array.array` or list of str
+        Values of the column.
+
+    """
+
+    def __init__(self):
+        self.values = array.array('l')
+        self._texts = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def typecode(self):
+        """str: Type code of the column: 'l' (integers), 'd' (floats) or None (text).
+
+        """
+        return getattr(self.values, 'typecode', None)
+
+    def append(self, text):
+        """Appends a value to the column.
+
+        Parameters
+        ----------
+        text : str
+            Value as text.
+
+        """
+        if self.typecode == 'l':
+            if INT_PATTERN.match(text):
+                try:
+                    self.__append_number(int(text), text)
+                    return
+                except OverflowError:
+                    pass
+            self.__promote(array.array('d', self.values))
+
+        if self.typecode == 'd':
+            if text == '':
+                self.values.append(NAN)
+                return
+            if FLOAT_PATTERN.match(text):
+                self.__append_number(float(text), text)
+                return
+            self.values = [self._texts.get(i, self.__to_text(value)) for i, value in enumerate(self.values)]
+            self._texts = {}
+
+        self.values.append(text)
+
+    def __append_number(self, value, text):
+        self.values.append(value)
+        if self.__to_text(self.values[-1]) != text:
+            self._texts[len(self.values) - 1] = text
+
+    def __promote(self, values):
+        for i, (value, promoted) in enumerate(zip(self.values, values)):
+            if i not in self._texts and self.__to_text(promoted) != self.__to_text(value):
+                self._texts[i] = self.__to_text(value)
+        self.values = values
+
+    @staticmethod
+    def __to_text(value):
+        if not isinstance(value, float):
+            return str(value)
+        if value != value:
+            return ''
+        text = repr(value)
+        return text[:-2] if text.endswith('.0') else text
+
+
+class ColumnarResult(object):
+    """Tabular data stored column by column.
+
+    Parameters
+    ----------
+    header : list of str
+        Names of the columns.
+
+    Attributes
+    ----------
+    header : list of str
+        Names of the columns.
+    index : dict of str : int
+        Position of each column by name. If names are repeated, the last position is kept.
+    columns : list of :obj:`Column`
+        Columns, in the order of `header`.
+
+    """
+
+    def __init__(self, header):
+        self.header = list(header)
+        self.index = dict((name, i) for i, name in enumerate(self.header))
+        self.columns = [Column() for name in self.header]
+
+    def __len__(self):
+        return len(self.columns[0]) if len(self.columns) > 0 else 0
+
+    def __getitem__(self, key):
+        """Returns the values of a column.
+
+        Parameters
+        ----------
+        key : str or int
+            Name or position of the column.
+
+        Returns
+        -------
+        :obj:`array.array` or list of str
+            Values of the column.
+
+        """
+        return self.__column(key).values
+
+    def append(self, row):
+        """Appends a row.
+
+        Parameters
+        ----------
+        row : list of str
+            Column values as text, in the order of `header`.
+
+        """
+        for column, value in zip(self.columns, row):
+            column.append(value)
+
+    def as_numpy(self, key):
+        """Returns the values of a column as a NumPy array.
+
+        Numeric columns share memory with the underlying `array.array`. Text columns are returned as arrays of
+        objects.
+
+        Parameters
+        ----------
+        key : str or int
+            Name or position of the column.
+
+        Returns
+        -------
+        :obj:`numpy.ndarray`
+            Values of the column.
+
+        Raises
+        ------
+        ImportError
+            If NumPy is not installed.
+
+        """
+        if numpy is None:
+            raise ImportError('NumPy is required to convert columns to NumPy arrays.')
+        column = self.__column(key)
+        if column.typecode == 'l':
+            return numpy.frombuffer(column.values, dtype=numpy.dtype('l'))
+        elif column.typecode == 'd':
+            return numpy.frombuffer(column.values, dtype=numpy.float64)
+        else:
+            return numpy.array(column.values, dtype=object)
+
+    def rows(self):
+        """Yields the rows of the result.
+
+        Yields
+        ------
+        tuple of :obj:`object`
+            Column values of each row.
+
+        """
+        for i in range(len(self)):
+            yield tuple([column.values[i] for column in self.columns])
+
+    def __column(self, key):
+        if isinstance(key, basestring):
+            if key not in self.index:
+                raise KeyError('Invalid column: %s.' % key)
+            key = self.index[key]
+        return self.columns[key]
@@ -17,8 +17,34 @@
 
 """
 
+import threading
+
 from io import StringIO
 from lxml import etree
+from xpath import compile_xpath
+
+_local = threading.local()
+
+
+def parse(content):
+    """Parses HTML content.
+
+    Parameters
+    ----------
+    content : str
+        HTML content to parse.
+
+    Returns
+    -------
+    :obj:`lxml.etree._ElementTree`
+        Parsed document. It can be passed to `xpath` to run several expressions without parsing `content` again.
+
+    """
+    parser = getattr(_local, 'parser', None)
+    if parser is None:
+        parser = etree.HTMLParser()
+        _local.parser = parser
+    return etree.parse(StringIO(content), parser)
 
 
 def xpath(content, expr):
@@ -26,8 +52,8 @@ def xpath(content, expr):
 
     Parameters
     ----------
-    content : str
-        HTML content to be searched.
+    content : str or :obj:`lxml.etree._ElementTree`
+        HTML content to be searched, or a document returned by `parse`.
     expr : str
         XPath expression to search for.
 
@@ -37,10 +63,5 @@ def xpath(content, expr):
         Node list that matches `expr`.
 
     """
-    parser = etree.HTMLParser()
-    tree = etree.parse(StringIO(content), parser)
-    node_list = tree.xpath(expr)
-    result = []
-    for node in node_list:
-        result += [node]
-    return result
+    tree = parse(content) if isinstance(content, basestring) else content
+    return list(compile_xpath(expr)(tree))
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# Copyright 2018 Alexandre Freitas
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing a registry of compiled XPath expressions.
+
+Expressions are compiled once per set of namespaces and shared by all callers, so evaluating them does not parse the
+expression again.
+
+"""
+
+import threading
+
+from lxml import etree
+
+_registry = dict()
+_lock = threading.Lock()
+
+
+def compile_xpath(expr, namespaces=None):
+    """Returns a compiled XPath expression.
+
+    Parameters
+    ----------
+    expr : str
+        XPath expression.
+    namespaces : dict of str : str, optional
+        Namespace URIs by prefix used in `expr`.
+
+    Returns
+    -------
+    :obj:`lxml.etree.XPath`
+        Compiled expression. Call it with a document or element to evaluate it.
+
+    """
+    key = (expr, tuple(sorted(namespaces.items())) if namespaces else None)
+    compiled = _registry.get(key)
+    if compiled is None:
+        with _lock:
+            compiled = _registry.get(key)
+            if compiled is None:
+                compiled = etree.XPath(expr, namespaces=namespaces)
+                _registry[key] = compiled
+    return compiled
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+import cx_Oracle
 import db
 import datetime
 import inspect
@@ -9,9 +10,141 @@ import unittest
 from pyppmc.session import Session
 from pyppmc.request import Request
 from pyppmc.db import dm
+from pyppmc.db.cache import FIELDS, SECTION, MetadataCache
+from pyppmc.db.tokens import TokenResolver, rename_binds
 from tests import TestData
 
 
+class _Session(object):
+    """Session holding only the URL used to key metadata cache entries."""
+
+    def __init__(self, url):
+        self.url = url
+
+
+class _TokenCursor(object):
+    """Cursor resolving a token SQL with one bind variable (ID) to 'V<ID>', recording the statements executed."""
+
+    def __init__(self, fail_batch=False):
+        self.fail_batch = fail_batch
+        self.statements = []
+        self.rows = []
+
+    def prepare(self, sql):
+        self.prepared = sql
+
+    def bindnames(self):
+        return ['ID']
+
+    def execute(self, sql, params):
+        sql = sql or self.prepared
+        self.statements += [sql]
+        if 'UNION ALL' in sql:
+            if self.fail_batch:
+                raise cx_Oracle.DatabaseError('ORA-01427: single-row subquery returns more than one row')
+            self.rows = [(i, 'V%s' % params['B0_%d' % i]) for i in range(sql.count('AS idx'))]
+        else:
+            self.rows = [('V%s' % params['ID'],)]
+
+    def fetchall(self):
+        return self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class TokenResolverTestCase(unittest.TestCase):
+
+    TOKEN_SQL = "SELECT name FROM kwfl_workflows WHERE workflow_id = :ID AND ':ID' IS NOT NULL"
+
+    def test_rename_binds(self):
+        """Rename bind variables outside quoted literals."""
+        sql = "SELECT :id, ':ID', 'it''s :ID', :ID_2, :workflow_id FROM dual WHERE x = :Id"
+        self.assertEquals(rename_binds(sql, ['ID', 'WORKFLOW_ID'], 3),
+                          "SELECT :B0_3, ':ID', 'it''s :ID', :ID_2, :B1_3 FROM dual WHERE x = :B0_3",
+                          'Failed to rename bind variables.')
+
+    def test_resolve_in_batches(self):
+        """Resolve distinct bind values with one UNION ALL statement per batch."""
+        resolver = TokenResolver(batch_size=2)
+        cur = _TokenCursor()
+        rows = [{'ID': i} for i in [1, 2, 1, 3, 2]]
+        self.assertEquals(resolver.resolve(cur, 'WORKFLOW_NAME', self.TOKEN_SQL, rows),
+                          ['V1', 'V2', 'V1', 'V3', 'V2'], 'Wrong token values.')
+        self.assertEquals(len(cur.statements), 2, 'Failed to resolve values in batches.')
+        self.assertIn('UNION ALL', cur.statements[0], 'Failed to join token SQL copies.')
+        self.assertIn(':B0_1', cur.statements[0], 'Failed to rename bind variables.')
+        self.assertIn("':ID'", cur.statements[0], 'Quoted literal was renamed.')
+        self.assertNotIn('UNION ALL', cur.statements[1], 'Single value resolved with UNION ALL.')
+
+        # Resolved values are remembered
+        self.assertEquals(resolver.resolve(cur, 'WORKFLOW_NAME', self.TOKEN_SQL, [{'ID': 3}, {'ID': 1}]),
+                          ['V3', 'V1'], 'Wrong remembered token values.')
+        self.assertEquals(len(cur.statements), 2, 'Remembered values resolved again.')
+
+    def test_fall_back_to_single_statements(self):
+        """Resolve values one at a time when token SQL cannot be batched."""
+        resolver = TokenResolver()
+        cur = _TokenCursor(fail_batch=True)
+        self.assertEquals(resolver.resolve(cur, 'WORKFLOW_NAME', self.TOKEN_SQL, [{'ID': 1}, {'ID': 2}]),
+                          ['V1', 'V2'], 'Wrong token values.')
+        self.assertEquals(cur.statements[1:], [self.TOKEN_SQL] * 2, 'Failed to run token SQL once per value.')
+
+
+class MetadataCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loads = 0
+        self.stamp = datetime.datetime(2018, 1, 1)
+
+    def load(self):
+        self.loads += 1
+        return ['row %d' % self.loads]
+
+    def fetch(self, cache, session, id=1):
+        return cache.fetch(session, FIELDS, id, self.load, lambda: self.stamp)
+
+    def test_reuse_entries(self):
+        """Load metadata once per server URL and ID."""
+        cache = MetadataCache()
+        session = _Session('http://ppm1')
+        self.assertEquals(self.fetch(cache, session), self.fetch(cache, session), 'Failed to reuse cached entry.')
+        self.fetch(cache, _Session('http://ppm2'))
+        self.fetch(cache, session, id=2)
+        self.assertEquals(self.loads, 3, 'Entries of different servers or IDs were shared.')
+
+    def test_reload_on_stamp_change(self):
+        """Reload metadata when its LAST_UPDATE_DATE changes."""
+        cache = MetadataCache(check_interval=0)
+        session = _Session('http://ppm1')
+        self.fetch(cache, session)
+        self.assertEquals(self.fetch(cache, session), ['row 1'], 'Entry reloaded with unchanged stamp.')
+        self.stamp = datetime.datetime(2018, 1, 2)
+        self.assertEquals(self.fetch(cache, session), ['row 2'], 'Failed to reload entry on stamp change.')
+        self.assertEquals(self.fetch(cache, session), ['row 2'], 'Entry reloaded with unchanged stamp.')
+
+    def test_ignore_stamp_without_check_interval(self):
+        """Keep entries until they expire when no check interval is set."""
+        cache = MetadataCache()
+        session = _Session('http://ppm1')
+        self.fetch(cache, session)
+        self.stamp = datetime.datetime(2018, 1, 2)
+        self.assertEquals(self.fetch(cache, session), ['row 1'], 'Entry checked without check interval.')
+
+    def test_evict(self):
+        """Evict entries by kind and ID."""
+        cache = MetadataCache()
+        session = _Session('http://ppm1')
+        self.fetch(cache, session, id=1)
+        self.fetch(cache, session, id=2)
+        cache.fetch(session, SECTION, 1, lambda: 'section')
+        cache.evict(FIELDS, 1)
+        self.assertEquals(sorted(key[1:] for key in cache.keys()), [(FIELDS, 2), (SECTION, 1)],
+                          'Failed to evict entry.')
+        cache.evict(FIELDS)
+        self.assertEquals([key[1:] for key in cache.keys()], [(SECTION, 1)], 'Failed to evict entries of a kind.')
+
+
 class DMTestCase(unittest.TestCase, TestData):
 
     def setUp(self):
@@ -69,6 +202,62 @@ class DMTestCase(unittest.TestCase, TestData):
         self.assertIsNone(request.id, 'Failed to delete request.')
         print 'Request %d successfully deleted.' % int(request_id)
 
+    def test_get_many_requests(self):
+        """Retrieve several requests at once."""
+        persister = dm.RequestPersister(self.session)
+        saved = []
+        for i in range(3):
+            request = Request(persister)
+            request.fields['REQ.REQUEST_TYPE_ID'] = 20000
+            request.fields['REQ.WORKFLOW_ID'] = 20002
+            request.fields['REQ.DEPARTMENT_CODE'] = 'FINANCE'
+            request.fields['REQ.DESCRIPTION'] = 'Test Get Many Requests %d %s' % (
+                i, datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            request.fields['REQD.P.MODULE'] = 'MODULE_A'
+            request.fields['REQD.P.PLATFORM'] = 'LINUX'
+            request.fields['REQD.P.IMPACT'] = 'WARNING'
+            fields = dict(request.fields)
+            saved += [(persister.save(request, refresh=False), fields)]
+        try:
+            # IDs given as str are accepted
+            requests = persister.get_many([str(request.id) for request, fields in reversed(saved)])
+            self.assertEquals(len(requests), len(saved), 'Failed to retrieve requests.')
+            for (request, fields), retrieved in zip(reversed(saved), requests):
+                self.assertEquals(int(retrieved.id), int(request.id), 'Requests returned out of order.')
+                for field in ['REQ.DESCRIPTION', 'REQD.P.MODULE', 'REQD.P.PLATFORM', 'REQD.P.IMPACT']:
+                    self.assertEquals(retrieved.fields[field], fields[field],
+                                      'Wrong %s for request %s.' % (field, request.id))
+        finally:
+            for request, fields in saved:
+                request.delete()
+
+    def test_save_many_requests(self):
+        """Create several requests at once, reporting invalid ones."""
+        persister = dm.RequestPersister(self.session)
+        requests = []
+        for i in range(3):
+            request = Request(persister)
+            request.fields['REQ.REQUEST_TYPE_ID'] = 20000
+            request.fields['REQ.WORKFLOW_ID'] = 20002
+            request.fields['REQ.DEPARTMENT_CODE'] = 'FINANCE'
+            request.fields['REQ.DESCRIPTION'] = 'Test Save Many Requests %d %s' % (
+                i, datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            request.fields['REQD.P.MODULE'] = 'MODULE_A'
+            request.fields['REQD.P.PLATFORM'] = 'LINUX'
+            request.fields['REQD.P.IMPACT'] = 'WARNING'
+            requests += [request]
+        invalid = Request(persister)
+        requests.insert(1, invalid)
+        unknown = Request(persister)
+        unknown.request_type = 'Unknown Request Type %s' % datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+        requests.insert(3, unknown)
+
+        errors = persister.save_many(requests, commit_size=2)
+        self.assertEquals(sorted(errors.keys()), [1, 3], 'Failed to report invalid requests.')
+        for request in requests[:1] + requests[2:3] + requests[4:]:
+            self.assertIn('REQ.REQUEST_ID', request.fields, 'Failed to create request.')
+            request.delete()
+
     # TODO Implement test cases for Demand Management GET operations
     # TODO Implement test cases for Time Management operations
 
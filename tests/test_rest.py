@@ -8,6 +8,7 @@ import unittest
 from pyppmc.session import Session
 from pyppmc.request import Request
 from pyppmc.rest import dm
+from pyppmc.rest.client import AsyncClient
 from tests import TestData
 
 class DMTestCase(unittest.TestCase, TestData):
@@ -52,6 +53,13 @@ class DMTestCase(unittest.TestCase, TestData):
         self.assertNotIn('REQ.REQUEST_ID', request.fields, 'Failed to delete request.')
         print 'Request %d successfully deleted.' % int(request_id)
 
+    def test_async_client(self):
+        """Run several operations concurrently."""
+        with AsyncClient(self.session.http_session, concurrency=4, timeout=60) as client:
+            responses = client.gather([client.dm.get_enabled_request_types() for i in range(4)])
+        self.assertEquals(len(set([response.content for response in responses])), 1,
+                          'Concurrent operations returned different data.')
+
     # TODO Implement test cases for Demand Management GET operations
     # TODO Implement test cases for Time Management operations
 
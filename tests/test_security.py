@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+import inspect
+import sys
+import unittest
+
+from pyppmc import security
+from pyppmc.security import elgamal
+from tests import TestData
+
+
+class ElGamalTestCase(unittest.TestCase, TestData):
+
+    def setUp(self):
+        self.public_key = security.get_public_key(self.public_key_file)
+        self.private_key = security.get_private_key(self.private_key_file)
+
+    def test_encrypt_and_decrypt(self):
+        """Encrypt and decrypt texts of one and several blocks."""
+        for text in ['password', 'A longer secret spanning several blocks. ' * 5]:
+            encrypted = security.encrypt(text, self.public_key)
+            self.assertEquals(security.decrypt(encrypted, self.private_key), text, 'Failed to decrypt text.')
+
+    def test_encryptor(self):
+        """Encrypt several texts with a precomputed encryptor."""
+        texts = ['secret %d' % i for i in range(20)]
+        with security.Encryptor(self.public_key, pool_size=5) as encryptor:
+            encrypted = encryptor.encrypt_many(texts)
+        self.assertEquals(security.decrypt_many(encrypted, self.private_key), texts, 'Failed to decrypt texts.')
+
+    def test_decrypt_many(self):
+        """Decrypt several delimited texts at once."""
+        texts = ['secret %d' % i for i in range(20)]
+        encrypted = [security.PASSWORD_DELIMITER + security.encrypt(text, self.public_key) +
+                     security.PASSWORD_DELIMITER for text in texts]
+        self.assertEquals(security.decrypt_many(encrypted, self.private_key, processes=2), texts,
+                          'Failed to decrypt texts.')
+
+    def test_radix85(self):
+        """Encode and decode numbers of one and several radix85 chunks."""
+        for value in [0, 1, 84, 85, 85 ** 8 - 1, 85 ** 8, 3 ** 5000, self.public_key.p]:
+            encoded = elgamal.long_to_radix85(value)
+            self.assertNotEqual(encoded[:1], '0', 'Failed to strip leading zeros.')
+            self.assertEquals(elgamal.radix85_to_long(encoded), value, 'Failed to decode %d.' % value)
+
+
+if __name__ == '__main__':
+    suite = suite = unittest.TestSuite()
+    for cls in inspect.getmembers(sys.modules[__name__], inspect.isclass):
+        if issubclass(cls[1], unittest.TestCase):
+            for method in dir(cls[1]):
+                if method == 'runTest' or method.startswith('test_'):
+                    suite.addTest(cls[1](method))
+    unittest.TextTestRunner(verbosity=2).run(suite)
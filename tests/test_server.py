@@ -7,6 +7,7 @@ import unittest
 
 from pyppmc.session import Session
 from pyppmc.server import Server
+from pyppmc.util.cache import LRUCache
 from tests import TestData
 
 
@@ -82,6 +83,37 @@ class SQLRunnerTestCase(LogonTestCase):
             print row[0], row[1]
         self.assertGreater(len(result), 0, 'Failed to run query against db.')
 
+    def test_iter_query(self):
+        """Test streaming typed SQL query results."""
+        rows = list(self.server.iter_query("SELECT request_id, description FROM kcrt_requests WHERE ROWNUM <= 5",
+                                           named=True, coerce=True))
+        self.assertGreater(len(rows), 0, 'Failed to run query against db.')
+        for row in rows:
+            print row.REQUEST_ID, row.DESCRIPTION
+            self.assertIsInstance(row.REQUEST_ID, (int, long), 'Failed to coerce numeric value.')
+
+    def test_iter_query_paged(self):
+        """Test running a SQL query page by page."""
+        sql = "SELECT request_id, description FROM kcrt_requests WHERE ROWNUM <= 25 ORDER BY request_id"
+        rows = list(self.server.iter_query_paged(sql, page_size=10, concurrency=2, min_page_size=10))
+        self.assertEquals(rows, self.server.run_query(sql), 'Paged and single query results differ.')
+
+    def test_cached_query(self):
+        """Test returning SQL query results from cache."""
+        self.server.query_cache = LRUCache(ttl=60)
+        result = self.server.run_query("SELECT request_id FROM kcrt_requests WHERE ROWNUM <= 5")
+        cached = self.server.run_query("SELECT request_id\n  FROM kcrt_requests WHERE ROWNUM <= 5;")
+        self.assertEquals(result, cached, 'Cached query results differ.')
+        self.assertEquals(self.server.query_cache.hits, 1, 'Failed to return query results from cache.')
+
+    def test_run_query_columnar(self):
+        """Test running a SQL query into typed columns."""
+        sql = "SELECT request_id, description FROM kcrt_requests WHERE ROWNUM <= 5"
+        result = self.server.run_query_columnar(sql)
+        rows = self.server.run_query(sql)
+        self.assertEquals(len(result), len(rows), 'Failed to run query against db.')
+        self.assertEquals(list(result['REQUEST_ID']), [int(row[0]) for row in rows], 'Failed to parse numeric column.')
+
 
 if __name__ == '__main__':
     suite = suite = unittest.TestSuite()
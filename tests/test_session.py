@@ -1,15 +1,72 @@
 # -*- coding: utf-8 -*-
 # TODO Implement test cases for non admin users. Users mus login, but can't have access to administrative features.
 
+import glob
 import inspect
+import json
+import os
+import requests
+import shutil
 import sys
+import tempfile
 import unittest
 
-from pyppmc.session import Session
+from pyppmc.server import ServerNode
+from pyppmc.session import Session, SessionPool, SessionStore
 from requests import ConnectionError
 from tests import TestData
 
 
+class _StoredSession(object):
+    """Authenticated session data, as read by `SessionStore.save`."""
+
+    url = 'http://ppm.example.com/'
+    username = 'admin'
+    language = 'English'
+    base_url = 'http://ppm.example.com:8080'
+
+    def __init__(self):
+        self.http_session = requests.Session()
+        self.http_session.cookies.set('JSESSIONID', 'ABC123', domain='ppm.example.com', path='/itg/')
+        self.server_nodes = {'node1': ServerNode('node1', {'BASE_URL': self.base_url})}
+
+
+class SessionStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.store = SessionStore(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_save_and_load(self):
+        """Store sessions as JSON and load them back."""
+        session = _StoredSession()
+        self.store.save(session)
+        filename = glob.glob(os.path.join(self.path, '*'))[0]
+        with open(filename) as f:
+            json.load(f)
+        entry = self.store.load(session.url, session.username, session.language)
+        self.assertEquals(dict(entry['cookies']), dict(session.http_session.cookies), 'Failed to load cookies.')
+        self.assertEquals([cookie.path for cookie in entry['cookies']], ['/itg/'], 'Failed to load cookie path.')
+        self.assertEquals(entry['base_url'], session.base_url, 'Failed to load base URL.')
+        self.assertEquals(entry['server_nodes']['node1'].params, session.server_nodes['node1'].params,
+                          'Failed to load server nodes.')
+
+    def test_ignore_invalid_entries(self):
+        """Do not load entries that are not valid JSON sessions."""
+        session = _StoredSession()
+        self.store.save(session)
+        filename = glob.glob(os.path.join(self.path, '*'))[0]
+        for content in ["cos\nsystem\n(S'exit 1'\ntR.", '[["%s", "admin", "English"], {"cookies": 1}, null]' %
+                        session.url]:
+            with open(filename, 'w') as f:
+                f.write(content)
+            self.assertIsNone(self.store.load(session.url, session.username, session.language),
+                              'Invalid entry loaded.')
+
+
 class LogonTestCase(unittest.TestCase, TestData):
 
     def test_invalid_url(self):
@@ -58,6 +115,34 @@ class LogonTestCase(unittest.TestCase, TestData):
         session = Session(base_url, username, password, language)
         self.assertGreater(len(session.http_session.cookies), 0, 'Failed to log onto PPM.')
 
+    def test_stored_session(self):
+        """Test resuming a stored session."""
+        path = tempfile.mkdtemp()
+        try:
+            store = SessionStore(path)
+            session = Session(self.base_url, self.admin_username, self.admin_password, self.language, store)
+            self.assertEquals(len(store), 1, 'Failed to store session.')
+            resumed = Session(self.base_url, self.admin_username, self.admin_password, self.language, store)
+            self.assertEquals(dict(resumed.http_session.cookies), dict(session.http_session.cookies),
+                              'Failed to resume stored session.')
+            session.logout()
+            self.assertEquals(len(store), 0, 'Failed to remove session from store.')
+        finally:
+            shutil.rmtree(path)
+
+    def test_session_pool(self):
+        """Test reusing pooled sessions."""
+        pool = SessionPool(max_per_user=1)
+        try:
+            with pool.session(self.base_url, self.admin_username, self.admin_password, self.language) as session:
+                cookies = dict(session.http_session.cookies)
+            with pool.session(self.base_url, self.admin_username, self.admin_password, self.language) as session:
+                self.assertEquals(dict(session.http_session.cookies), cookies, 'Failed to reuse idle session.')
+            with self.assertRaises(RuntimeError, msg='Idle session reused with an invalid password.'):
+                pool.acquire(self.base_url, self.admin_username, self.admin_password + '_invalid', self.language)
+        finally:
+            pool.close()
+
 
 if __name__ == '__main__':
     suite = suite = unittest.TestSuite()
@@ -2,15 +2,74 @@
 
 import datetime
 import inspect
+import lxml.etree
+import requests
 import sys
 import unittest
 
 from pyppmc.session import Session
 from pyppmc.request import Request
-from pyppmc.soap import dm
+from pyppmc.server import Server
+from pyppmc.soap import NAMESPACES, Envelope, datetime_to_iso, dm
 from tests import TestData
 
 
+class _RecordingSession(object):
+    """HTTP session that records posted envelopes and answers with a fixed SOAP response."""
+
+    base_url = 'http://localhost/'
+
+    def __init__(self, content):
+        self.content = content
+        self.data = []
+
+    def post(self, url, data=None, **kwargs):
+        self.data += [data]
+        response = requests.Response()
+        response.status_code = requests.codes.ok
+        response._content = self.content
+        return response
+
+
+class EnvelopeTestCase(unittest.TestCase):
+
+    def test_escape_values(self):
+        """Escape and encode element values."""
+        values = ['<b>Tom & "Jerry"</b>', u'Ação é <urgente>', 'a]]>b']
+        envelope = Envelope('ns:op', {'ns': NAMESPACES['service']})
+        for value in values:
+            envelope.element('ns:value', value)
+        tree = lxml.etree.fromstring(envelope.to_string())
+        texts = tree.xpath('//service:value/text()', namespaces=NAMESPACES)
+        self.assertEquals(texts, [value if isinstance(value, unicode) else value.decode('utf-8') for value in values],
+                          'Envelope values differ from the given ones.')
+
+    def test_set_request_fields_envelope(self):
+        """Send escaped string and date fields on setRequestFields."""
+        http_session = _RecordingSession(
+            '<soapenv:Envelope xmlns:soapenv="%s"><soapenv:Body><ns:setRequestFieldsResponse xmlns:ns="%s">'
+            '<ns:return>30000</ns:return></ns:setRequestFieldsResponse></soapenv:Body></soapenv:Envelope>' % (
+                NAMESPACES['soapenv'], NAMESPACES['service']))
+        fields = {
+            'REQ.DESCRIPTION': u'Ação <urgente> & "rápida"',
+            'REQD.P.DUE_DATE': datetime.datetime(2018, 1, 31, 12, 30),
+            'REQD.P.EMPTY': None
+        }
+        self.assertEquals(dm.set_request_fields(http_session, 30000, fields), 30000, 'Failed to parse response.')
+
+        tree = lxml.etree.fromstring(http_session.data[0])
+        self.assertEquals(tree.xpath('//service:requestId/pre:id/text()', namespaces=NAMESPACES), ['30000'],
+                          'Wrong request ID sent.')
+        sent = dict()
+        for field in tree.xpath('//service:fields', namespaces=NAMESPACES):
+            name = field.xpath('./common:name/text()', namespaces=NAMESPACES)[0]
+            sent[name] = (field.xpath('./pre:stringValue/text()', namespaces=NAMESPACES) +
+                          field.xpath('./pre:dateValue/text()', namespaces=NAMESPACES))
+        self.assertEquals(sent, {'REQ.DESCRIPTION': [fields['REQ.DESCRIPTION']],
+                                 'REQD.P.DUE_DATE': [datetime_to_iso(fields['REQD.P.DUE_DATE'])]},
+                          'Wrong fields sent.')
+
+
 class DMTestCase(unittest.TestCase, TestData):
 
     def setUp(self):
@@ -43,15 +102,58 @@ class DMTestCase(unittest.TestCase, TestData):
         request2 = persister.get(int(request_id))
         self.assertIsInstance(request2, Request, 'Failed to retrieve created request.')
         print 'Request %d fields:'
-        for token in request2.tokens.keys():
-            print '\t%s: %s' % (token, request2.tokens[token])
-            self.assertEquals(request.fields[token], request2.tokens[token], 'Requests contain different data.')
+        for token in request2.fields.keys():
+            print '\t%s: %s' % (token, request2.fields[token])
+            self.assertEquals(request.fields[token], request2.fields[token], 'Requests contain different data.')
 
         # Delete request
         request.delete()
         self.assertNotIn('REQ.REQUEST_ID', request.fields, 'Failed to delete request.')
         print 'Request %d successfully deleted.' % int(request_id)
 
+    def test_get_requests_in_chunks(self):
+        """Retrieve several requests in chunks."""
+        result = Server(self.session).run_query("SELECT request_id FROM kcrt_requests WHERE ROWNUM <= 5")
+        request_ids = [int(row[0]) for row in result]
+        requests = dm.get_requests(self.session.http_session, request_ids)
+        chunked = dm.get_requests(self.session.http_session, request_ids, chunk_size=2, concurrency=2)
+        self.assertEquals([request.fields for request in chunked], [request.fields for request in requests],
+                          'Chunked and single retrieval return different data.')
+
+    def test_iter_requests(self):
+        """Stream several requests."""
+        result = Server(self.session).run_query("SELECT request_id FROM kcrt_requests WHERE ROWNUM <= 5")
+        request_ids = [int(row[0]) for row in result]
+        requests = dm.get_requests(self.session.http_session, request_ids)
+        streamed = list(dm.iter_requests(self.session.http_session, request_ids, chunk_size=2))
+        self.assertEquals([request.fields for request in streamed], [request.fields for request in requests],
+                          'Streamed and single retrieval return different data.')
+
+    def test_save_many_requests(self):
+        """Create several requests at once, reporting invalid ones."""
+        persister = dm.RequestSoap(self.session.http_session)
+        requests = []
+        for i in range(3):
+            request = Request(persister)
+            request.fields['REQ.REQUEST_TYPE_NAME'] = 'Bug'
+            request.fields['REQ.DEPARTMENT_CODE'] = 'Finance'
+            request.fields['REQ.WORKFLOW_NAME'] = 'Bug Request Type Workflow'
+            request.fields['REQ.DESCRIPTION'] = 'Test Save Many Requests %d %s' % (
+                i, datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            request.fields['REQD.MODULE'] = 'Module A'
+            request.fields['REQD.PLATFORM'] = 'Linux'
+            request.fields['REQD.IMPACT'] = 'Warning'
+            request.fields['REQD.REPRO'] = 'Yes'
+            requests += [request]
+        invalid = Request(persister)
+        requests.insert(1, invalid)
+
+        errors = persister.save_many(requests, concurrency=2)
+        self.assertEquals(errors.keys(), [1], 'Failed to report invalid request.')
+        for request in requests[:1] + requests[2:]:
+            self.assertIn('REQ.REQUEST_ID', request.fields, 'Failed to create request.')
+            request.delete()
+
     # TODO Implement test cases for Demand Management operations
 
 
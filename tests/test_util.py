@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+import inspect
+import sys
+import unittest
+
+from pyppmc.util import batch
+from pyppmc.util.cache import LRUCache
+from pyppmc.util.columnar import Column, ColumnarResult
+
+
+class BatchTestCase(unittest.TestCase):
+
+    def test_adaptive_dispatch(self):
+        """Process batches concurrently and yield them in order."""
+        batch_size = batch.AdaptiveBatchSize(3, 1, 50, target=0.01)
+        batches = list(batch.adaptive_dispatch(lambda offset, size: range(offset, offset + size), batch_size, 4, 100))
+        self.assertEquals(sum([values for offset, size, values in batches], []), range(100), 'Batches out of order.')
+        self.assertGreater(batch_size.size, 3, 'Failed to adapt batch size.')
+
+
+class LRUCacheTestCase(unittest.TestCase):
+
+    def test_evict_least_recently_used(self):
+        """Evict the least recently used entry when the cache is full."""
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEquals(cache.keys(), ['a', 'c'], 'Failed to evict least recently used entry.')
+        self.assertIsNone(cache.get('b'), 'Evicted entry returned.')
+        self.assertEquals((cache.hits, cache.misses), (1, 1), 'Wrong hit and miss counters.')
+
+    def test_expire_entries(self):
+        """Expire entries after their time to live."""
+        cache = LRUCache(ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2, ttl=0)
+        self.assertIn('a', cache, 'Valid entry expired.')
+        self.assertNotIn('b', cache, 'Failed to expire entry.')
+        self.assertEquals(cache.get('b', 'default'), 'default', 'Expired entry returned.')
+
+    def test_disabled_cache(self):
+        """Do not store entries when max_size is 0."""
+        cache = LRUCache(max_size=0)
+        cache.set('a', 1)
+        self.assertEquals(len(cache), 0, 'Disabled cache stored an entry.')
+
+
+class ColumnTestCase(unittest.TestCase):
+
+    def test_numeric_columns(self):
+        """Store integer and float columns as typed arrays."""
+        result = ColumnarResult(['ID', 'AMOUNT'])
+        for row in [['1', '2.5'], ['2', '3'], ['3', '']]:
+            result.append(row)
+        self.assertEquals(result['ID'].typecode, 'l', 'Failed to store integer column.')
+        self.assertEquals(result['AMOUNT'].typecode, 'd', 'Failed to store float column.')
+        self.assertEquals(sum(result['ID']), 6, 'Failed to parse integer column.')
+
+    def test_promote_to_text(self):
+        """Keep the original text of numbers when a column is promoted to text."""
+        values = ['1', '0012', '1.10', '-0', '', '9007199254740993', '1e400', '100000000000000000000000', 'ABC']
+        column = Column()
+        for value in values:
+            column.append(value)
+        self.assertIsNone(column.typecode, 'Failed to promote column to text.')
+        self.assertEquals(column.values, values, 'Column values differ from the appended text.')
+
+
+if __name__ == '__main__':
+    suite = suite = unittest.TestSuite()
+    for cls in inspect.getmembers(sys.modules[__name__], inspect.isclass):
+        if issubclass(cls[1], unittest.TestCase):
+            for method in dir(cls[1]):
+                if method == 'runTest' or method.startswith('test_'):
+                    suite.addTest(cls[1](method))
+    unittest.TextTestRunner(verbosity=2).run(suite)